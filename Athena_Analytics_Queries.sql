@@ -32,6 +32,463 @@ STORED AS INPUTFORMAT 'org.apache.hadoop.mapred.TextInputFormat' OUTPUTFORMAT 'o
 LOCATION 's3://2025tmdbmoviedata/daily_outputs/'
 TBLPROPERTIES ('classification' = 'csv');
 
+-- Parquet output (OUTPUT_FORMAT=parquet): typed, compressed columns, so Athena reads
+-- only the columns a query references and skips row groups using min/max statistics.
+-- Text fields with commas (overview, genres, keywords) are stored intact.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_parquet (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date DATE,
+  release_year INT,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/daily_outputs_parquet/';
+
+-- ORC output (OUTPUT_FORMAT=orc) uses the same columns
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_orc (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date DATE,
+  release_year INT,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+STORED AS ORC
+LOCATION 's3://2025tmdbmoviedata/daily_outputs_orc/';
+
+-- Date-partitioned output (OUTPUT_PARTITIONING=date): each run lands in dt=YYYY-MM-DD/.
+-- Partition projection computes partitions from the table properties, so no
+-- MSCK REPAIR / Glue crawler is needed and a dt filter reads only that day's prefix.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_by_day (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date DATE,
+  release_year INT,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+PARTITIONED BY (dt STRING)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/daily_outputs_parquet/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://2025tmdbmoviedata/daily_outputs_parquet/dt=${dt}/'
+);
+
+-- Date and release-year partitioned output (OUTPUT_PARTITIONING=date_release_year).
+-- release_year moves out of the files into the partition; unknown years are written
+-- to release_year=0, so filter with release_year > 0 where the original used IS NOT NULL.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_by_day_year (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date DATE,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+PARTITIONED BY (dt STRING, release_year INT)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/daily_outputs_parquet/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'projection.release_year.type' = 'integer',
+  'projection.release_year.range' = '0,2100',
+  'storage.location.template' = 's3://2025tmdbmoviedata/daily_outputs_parquet/dt=${dt}/release_year=${release_year}/'
+);
+
+-- The same partitioned tables for CSV output (OUTPUT_FORMAT=csv, under daily_outputs/).
+-- Columns are read by position, in the writer's name order, and each file starts with a
+-- header row. OpenCSVSerde honours the writer's quoting, so values with commas (genres,
+-- overview) stay in one column. It reads DATE columns only as days since the epoch, so
+-- release_date is a STRING here: use DATE(release_date) in queries. gzip-compressed files
+-- (CSV_COMPRESSION=gzip) are read as they are.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_csv_by_day (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date STRING,
+  release_year INT,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+PARTITIONED BY (dt STRING)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+WITH SERDEPROPERTIES ('separatorChar' = ',', 'quoteChar' = '"')
+STORED AS INPUTFORMAT 'org.apache.hadoop.mapred.TextInputFormat' OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://2025tmdbmoviedata/daily_outputs/'
+TBLPROPERTIES (
+  'classification' = 'csv',
+  'skip.header.line.count' = '1',
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://2025tmdbmoviedata/daily_outputs/dt=${dt}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_csv_by_day_year (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date STRING,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+PARTITIONED BY (dt STRING, release_year INT)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+WITH SERDEPROPERTIES ('separatorChar' = ',', 'quoteChar' = '"')
+STORED AS INPUTFORMAT 'org.apache.hadoop.mapred.TextInputFormat' OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://2025tmdbmoviedata/daily_outputs/'
+TBLPROPERTIES (
+  'classification' = 'csv',
+  'skip.header.line.count' = '1',
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'projection.release_year.type' = 'integer',
+  'projection.release_year.range' = '0,2100',
+  'storage.location.template' = 's3://2025tmdbmoviedata/daily_outputs/dt=${dt}/release_year=${release_year}/'
+);
+
+-- Optional, only with DATE_FEATURES=true: release date features add days_since_release,
+-- release_month and release_quarter. Parquet/ORC columns are matched by name, so the
+-- columnar tables just need them added; the CSV table reads columns by position (sorted by
+-- name), so recreate it with the new columns in their alphabetical places instead.
+-- Left commented out so running this file doesn't change the schema; uncomment it once
+-- DATE_FEATURES is enabled.
+-- ALTER TABLE tmdb_movie_database.movie_data_parquet ADD COLUMNS (
+--   days_since_release INT,
+--   release_month INT,
+--   release_quarter INT
+-- );
+
+-- Current state (CURRENT_STATE_MERGE=true with OUTPUT_FORMAT=parquet): one row per movie,
+-- its latest, upserted into movie_id % 64 buckets. The daily tables above stay the
+-- append-only history. Keep bucket.range in step with CURRENT_STATE_BUCKETS.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_current_state (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date DATE,
+  release_year INT,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT
+)
+PARTITIONED BY (bucket INT)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/current_state_parquet/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.bucket.type' = 'integer',
+  'projection.bucket.range' = '0,63',
+  'storage.location.template' = 's3://2025tmdbmoviedata/current_state_parquet/bucket=${bucket}/'
+);
+
+-- Compacted history (compaction_handler): large Parquet files sorted by (dt, movie_id),
+-- listed in a symlink manifest that each compaction replaces in one PUT, so queries
+-- never see a half-swapped range. dt is an ordinary column here, not a partition.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_data_compacted (
+  adult STRING,
+  budget BIGINT,
+  genres STRING,
+  homepage STRING,
+  imdb_id STRING,
+  keywords STRING,
+  movie_id BIGINT,
+  original_language STRING,
+  overview STRING,
+  popularity DOUBLE,
+  popularity_category STRING,
+  poster_url STRING,
+  production_companies STRING,
+  profit BIGINT,
+  release_date DATE,
+  release_year INT,
+  revenue BIGINT,
+  roi DOUBLE,
+  runtime INT,
+  spoken_languages STRING,
+  status STRING,
+  tagline STRING,
+  title STRING,
+  vote_average DOUBLE,
+  vote_count INT,
+  dt STRING
+)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://2025tmdbmoviedata/compacted/_symlink/';
+
+-- Rollups (ROLLUPS=true): one small CSV of per-dimension aggregates over the current
+-- state, updated at load time. Dashboards read kilobytes here instead of scanning the
+-- fact table. dimension is release_year, genres (one row per genre), original_language
+-- or popularity_category; p50/p90 come from sketches, within ROLLUP_SKETCH_ACCURACY.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_rollups (
+  dimension STRING,
+  value STRING,
+  movies BIGINT,
+  budget_sum DOUBLE,
+  budget_count BIGINT,
+  budget_avg DOUBLE,
+  revenue_sum DOUBLE,
+  revenue_count BIGINT,
+  revenue_avg DOUBLE,
+  profit_sum DOUBLE,
+  profit_count BIGINT,
+  profit_avg DOUBLE,
+  roi_sum DOUBLE,
+  roi_count BIGINT,
+  roi_avg DOUBLE,
+  vote_average_sum DOUBLE,
+  vote_average_count BIGINT,
+  vote_average_avg DOUBLE,
+  popularity_sum DOUBLE,
+  popularity_count BIGINT,
+  popularity_avg DOUBLE,
+  revenue_p50 DOUBLE,
+  revenue_p90 DOUBLE,
+  roi_p50 DOUBLE,
+  roi_p90 DOUBLE
+)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.lazy.LazySimpleSerDe'
+WITH SERDEPROPERTIES ('field.delim' = ',')
+STORED AS INPUTFORMAT 'org.apache.hadoop.mapred.TextInputFormat' OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://2025tmdbmoviedata/rollups/'
+TBLPROPERTIES ('classification' = 'csv', 'skip.header.line.count' = '1');
+
+-- Bridge and dimension tables (BRIDGE_TABLES=true with OUTPUT_FORMAT=parquet). Each run
+-- writes movie -> genre/keyword/company rows keyed by TMDB id under dt=YYYY-MM-DD/,
+-- next to the day's fact rows; position is the entity's place in TMDB's list (0 for a
+-- movie's primary genre). The dimension tables map ids to names.
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_genre (
+  movie_id BIGINT,
+  genre_id BIGINT,
+  position INT
+)
+PARTITIONED BY (dt STRING)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/bridges_parquet/movie_genre/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://2025tmdbmoviedata/bridges_parquet/movie_genre/dt=${dt}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_keyword (
+  movie_id BIGINT,
+  keyword_id BIGINT,
+  position INT
+)
+PARTITIONED BY (dt STRING)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/bridges_parquet/movie_keyword/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://2025tmdbmoviedata/bridges_parquet/movie_keyword/dt=${dt}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.movie_company (
+  movie_id BIGINT,
+  company_id BIGINT,
+  position INT
+)
+PARTITIONED BY (dt STRING)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/bridges_parquet/movie_company/'
+TBLPROPERTIES (
+  'projection.enabled' = 'true',
+  'projection.dt.type' = 'date',
+  'projection.dt.format' = 'yyyy-MM-dd',
+  'projection.dt.range' = 'NOW-5YEARS,NOW',
+  'projection.dt.interval' = '1',
+  'projection.dt.interval.unit' = 'DAYS',
+  'storage.location.template' = 's3://2025tmdbmoviedata/bridges_parquet/movie_company/dt=${dt}/'
+);
+
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.dim_genre (
+  genre_id BIGINT,
+  name STRING
+)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/bridges_parquet/dim_genre/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.dim_keyword (
+  keyword_id BIGINT,
+  name STRING
+)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/bridges_parquet/dim_keyword/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS tmdb_movie_database.dim_company (
+  company_id BIGINT,
+  name STRING
+)
+STORED AS PARQUET
+LOCATION 's3://2025tmdbmoviedata/bridges_parquet/dim_company/';
+
+-- Latest day only: the dt predicate prunes every other day's prefix
+SELECT title, popularity, vote_average
+FROM tmdb_movie_database.movie_data_by_day
+WHERE dt = CAST(current_date AS VARCHAR)
+ORDER BY popularity DESC
+LIMIT 20;
+
 -- Revenue Trends by Year
 SELECT release_year,
        COUNT(*) AS movies,
@@ -49,6 +506,13 @@ WHERE revenue IS NOT NULL AND budget IS NOT NULL
 ORDER BY profit DESC
 LIMIT 10;
 
+-- Top 10 Most Profitable Movies from the current state: one row per movie, so no DISTINCT
+SELECT title, revenue, budget, profit
+FROM tmdb_movie_database.movie_current_state
+WHERE budget > 0
+ORDER BY profit DESC
+LIMIT 10;
+
 -- ROI Analysis by Genre
 SELECT genres,
        COUNT(*) AS movie_count,
@@ -58,3 +522,44 @@ FROM movie_database.movie_data
 WHERE genres != 'Unknown' AND roi IS NOT NULL
 GROUP BY genres
 ORDER BY avg_roi DESC;
+
+-- Revenue Trends by Year from the rollups
+SELECT CAST(value AS INT) AS release_year,
+       movies,
+       FORMAT('%,.2f', revenue_sum / NULLIF(revenue_count, 0)) AS avg_revenue,
+       revenue_p50 AS median_revenue
+FROM tmdb_movie_database.movie_rollups
+WHERE dimension = 'release_year' AND value != 'Unknown'
+ORDER BY release_year;
+
+-- ROI by individual genre from the rollups (roi_avg is NULL where no movie has a defined ROI)
+SELECT value AS genre,
+       movies,
+       roi_avg,
+       roi_p50 AS median_roi,
+       profit_avg
+FROM tmdb_movie_database.movie_rollups
+WHERE dimension = 'genres'
+ORDER BY roi_avg DESC;
+
+-- ROI by individual genre for one day: integer joins instead of splitting "Action, War"
+SELECT g.name AS genre,
+       COUNT(*) AS movie_count,
+       AVG(f.roi) AS avg_roi,
+       AVG(f.profit) AS avg_profit
+FROM tmdb_movie_database.movie_data_by_day f
+JOIN tmdb_movie_database.movie_genre b ON b.movie_id = f.movie_id AND b.dt = f.dt
+JOIN tmdb_movie_database.dim_genre g ON g.genre_id = b.genre_id
+WHERE f.dt = CAST(current_date AS VARCHAR) AND f.roi IS NOT NULL
+GROUP BY g.name
+ORDER BY avg_roi DESC;
+
+-- Seasonal Release Trends (needs DATE_FEATURES=true)
+SELECT release_quarter,
+       release_month,
+       COUNT(*) AS movies,
+       FORMAT('%,.2f', AVG(revenue)) AS avg_revenue
+FROM tmdb_movie_database.movie_data_parquet
+WHERE release_month IS NOT NULL AND revenue > 0
+GROUP BY release_quarter, release_month
+ORDER BY release_month;
@@ -0,0 +1,640 @@
+"""Benchmarks for the TMDB ETL pipeline.
+
+Runs the pipeline stages against a local stub TMDB server so numbers are
+reproducible and don't consume API quota. Usage:
+
+    python benchmarks.py extraction --pages 20 --latency 0.05
+    python benchmarks.py pipeline --pages 10 --workers 5
+    python benchmarks.py transport --pages 10 --workers 5
+    python benchmarks.py concurrency --capacity 8 --workers 16
+    python benchmarks.py incremental --pages 10 --runs 3
+    python benchmarks.py storage --rows 100000  (needs pyarrow)
+    python benchmarks.py upload --rows 10000 50000 100000
+    python benchmarks.py batch --rows 10000 100000 1000000
+    python benchmarks.py stats --rows 1000000
+    python benchmarks.py dates --rows 1000000
+"""
+import argparse
+import datetime
+import gc
+import gzip
+import json
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tmdb_etl_lambda as etl
+
+MOVIES_PER_PAGE = 20
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    """Serves deterministic /movie/popular and /movie/{id} responses"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body are separate writes; avoid delayed-ACK stalls on keep-alive
+
+    def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        parts = parsed.path.strip("/").split("/")
+        with self.server.lock:
+            self.server.in_flight += 1
+            overloaded = self.server.capacity and self.server.in_flight > self.server.capacity
+            self.server.requests += 1
+            self.server.rejected += int(bool(overloaded))
+        try:
+            time.sleep(self.server.latency)
+            if overloaded:
+                headers = {"Retry-After": str(self.server.retry_after)} if self.server.retry_after is not None else {}
+                self.send_json(429, {"status_code": 25, "status_message": "Rate limit exceeded"}, headers)
+            else:
+                self.route(parts, query)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def route(self, parts, query):
+        if parts[-2:] == ["movie", "changes"]:
+            # Every 7th movie changed; served two per page to exercise pagination
+            page = int(query.get("page", ["1"])[0])
+            changed = list(range(7, self.server.changed_up_to + 1, 7))
+            total_pages = max(1, (len(changed) + 1) // 2)
+            results = [{"id": movie_id, "adult": False} for movie_id in changed[(page - 1) * 2:page * 2]]
+            body = {"page": page, "results": results, "total_pages": total_pages}
+        elif parts[-2:] == ["movie", "popular"]:
+            page = int(query.get("page", ["1"])[0])
+            body = {"page": page, "results": [stub_movie(movie_id) for movie_id in page_movie_ids(page)]}
+        elif len(parts) >= 2 and parts[-2] == "movie" and parts[-1].isdigit():
+            with self.server.lock:
+                self.server.detail_requests += 1
+            etag = f'"{parts[-1]}-v1"'  # Stub details never change, so the ETag is stable
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_json(200, stub_movie_details(int(parts[-1])), {"ETag": etag})
+            return
+        else:
+            self.send_error(404)
+            return
+
+        self.send_json(200, body)
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def page_movie_ids(page):
+    # Consecutive pages overlap by one movie, like the live popular list drifting between requests
+    start = (page - 1) * (MOVIES_PER_PAGE - 1)
+    return range(start + 1, start + MOVIES_PER_PAGE + 1)
+
+
+def stub_movie(movie_id):
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "release_date": f"{1990 + movie_id % 35}-{movie_id % 12 + 1:02d}-{movie_id % 28 + 1:02d}",
+        "vote_average": round(5 + (movie_id % 50) / 10, 1),
+        "vote_count": movie_id * 7 % 5000,
+        "popularity": float(movie_id * 37 % 900),
+        "overview": f"Overview for movie {movie_id}, with a comma.",
+        "poster_path": f"/poster{movie_id}.jpg",
+    }
+
+
+def stub_movie_details(movie_id):
+    return {
+        **stub_movie(movie_id),
+        "budget": movie_id * 100000 % 200000000,
+        "revenue": movie_id * 350000 % 900000000,
+        "runtime": 80 + movie_id % 70,
+        "status": "Released",
+        "tagline": "",
+        "genres": [{"id": 28, "name": "Action"}, {"id": 18 + movie_id % 3, "name": f"Genre {movie_id % 3}"}],
+        "production_companies": [{"id": movie_id % 40, "name": f"Studio {movie_id % 40}"}],
+        "spoken_languages": [{"iso_639_1": "en", "name": "English"}],
+        "original_language": "en",
+        "adult": False,
+        "homepage": "",
+        "imdb_id": f"tt{movie_id:07d}",
+        "keywords": {"keywords": [{"id": 1000 + movie_id % 25, "name": f"keyword {movie_id % 25}"}]},
+    }
+
+
+class StubTMDBServer:
+    """Runs the stub server on a background thread and points the pipeline at it"""
+
+    def __init__(self, latency=0.05, capacity=None, retry_after=None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubTMDBHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.capacity = capacity  # Concurrent requests served before answering 429
+        self.httpd.retry_after = retry_after  # Retry-After value sent with 429s
+        self.httpd.changed_up_to = 100  # /movie/changes reports every 7th ID up to this one
+        self.httpd.lock = threading.Lock()
+        self.httpd.in_flight = 0
+        self.httpd.requests = 0
+        self.httpd.rejected = 0
+        self.httpd.detail_requests = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        self._original_base_url = etl.BASE_URL
+        etl.BASE_URL = f"http://127.0.0.1:{self.httpd.server_address[1]}/3"
+        return self
+
+    def __exit__(self, *exc):
+        etl.BASE_URL = self._original_base_url
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_extraction(args):
+    """Compares pages/sec for the sequential and asyncio page loops"""
+    etl.rate_limiter = etl.TokenBucket(args.rate_limit, etl.TMDB_RATE_BURST)
+    with StubTMDBServer(latency=args.latency):
+        sequential, sequential_time = timed(etl.fetch_movies, max_pages=args.pages)
+        concurrent, async_time = timed(
+            etl.fetch_movies_async,
+            max_pages=args.pages,
+            concurrency=args.concurrency
+        )
+
+    assert sequential == concurrent, "async extraction must produce the same movies_list"
+    print(f"{'mode':<12}{'pages':>8}{'seconds':>10}{'pages/sec':>12}")
+    for mode, seconds in (("sequential", sequential_time), ("async", async_time)):
+        print(f"{mode:<12}{args.pages:>8}{seconds:>10.2f}{args.pages / seconds:>12.1f}")
+    print(f"{len(sequential)} unique movies; speedup {sequential_time / async_time:.1f}x")
+
+
+def bench_pipeline(args):
+    """Compares wall-clock for the batch barrier and the streaming listing/enrichment overlap"""
+    with StubTMDBServer(latency=args.latency):
+        # Each mode starts with a fresh bucket, so neither inherits the other's drained tokens
+        etl.rate_limiter = etl.TokenBucket(args.rate_limit, etl.TMDB_RATE_BURST)
+        movies_list, list_time = timed(etl.fetch_movies, max_pages=args.pages)
+        batch, detail_time = timed(
+            etl.enrich_movie_data_parallel, movies_list, max_details=args.max_details, max_workers=args.workers
+        )
+        etl.rate_limiter = etl.TokenBucket(args.rate_limit, etl.TMDB_RATE_BURST)
+        streaming, streaming_time = timed(
+            etl.stream_enrich_movies,
+            max_pages=args.pages,
+            max_details=args.max_details,
+            max_workers=args.workers,
+            queue_size=args.queue_size
+        )
+
+    assert batch == streaming, "streaming mode must produce the same enriched movies"
+    print(f"{'mode':<12}{'movies':>8}{'seconds':>10}")
+    print(f"{'batch':<12}{len(batch):>8}{list_time + detail_time:>10.2f}  (list {list_time:.2f} + details {detail_time:.2f})")
+    print(f"{'streaming':<12}{len(streaming):>8}{streaming_time:>10.2f}  (max(list, details) = {max(list_time, detail_time):.2f})")
+
+
+def bench_transport(args):
+    """Compares fresh-connection urllib requests with the pooled keep-alive transport"""
+    original_transport = etl.http_transport
+    results = {}
+    with StubTMDBServer(latency=args.latency):
+        etl.rate_limiter = etl.TokenBucket(0, 1)  # Listing is setup, not part of either measurement
+        movies_list = etl.fetch_movies_async(max_pages=args.pages)
+        for name in ("urllib", "pooled"):
+            etl.rate_limiter = etl.TokenBucket(args.rate_limit, etl.TMDB_RATE_BURST)
+            transport = etl.create_http_transport(name)
+            etl.set_http_transport(transport)
+            _, seconds = timed(etl.enrich_movie_data_parallel, movies_list, max_workers=args.workers)
+            results[name] = (seconds, transport.metrics.snapshot())
+            if hasattr(transport, "close"):
+                transport.close()
+    etl.set_http_transport(original_transport)
+
+    print(f"{'transport':<10}{'requests':>10}{'opened':>8}{'reuse':>8}{'p50 ms':>8}{'p95 ms':>8}{'seconds':>9}")
+    for name, (seconds, metrics) in results.items():
+        print(f"{name:<10}{metrics['requests']:>10}{metrics['connections_opened']:>8}"
+              f"{metrics['connection_reuse_ratio']:>8.2f}{metrics['latency_ms_p50']:>8}"
+              f"{metrics['latency_ms_p95']:>8}{seconds:>9.2f}")
+
+
+def bench_concurrency(args):
+    """Compares a fixed detail worker pool with the AIMD concurrency controller against a capacity-limited server"""
+    etl.rate_limiter = etl.TokenBucket(0, 1)  # Let the server's capacity, not the token bucket, be the limit
+    print(f"{'mode':<10}{'movies':>8}{'requests':>10}{'429s':>6}{'limit':>7}{'backoff s':>10}{'seconds':>9}")
+    for mode in ("fixed", "adaptive"):
+        etl.retry_budget.reset()
+        with StubTMDBServer(latency=args.latency, capacity=args.capacity, retry_after=args.retry_after) as server:
+            movies_list = [{"movie_id": movie_id} for movie_id in range(1, args.movies + 1)]
+            controller = etl.AIMDConcurrencyController(
+                initial=args.workers, max_limit=args.max_concurrency
+            ) if mode == "adaptive" else None
+            enriched, seconds = timed(
+                etl.enrich_movie_data_parallel, movies_list,
+                max_workers=args.workers, concurrency_controller=controller
+            )
+            limit = controller.snapshot()["limit"] if controller else args.workers
+            print(f"{mode:<10}{len(enriched):>8}{server.httpd.requests:>10}{server.httpd.rejected:>6}"
+                  f"{limit:>7}{etl.retry_budget.snapshot()['backoff_seconds']:>10.1f}{seconds:>9.2f}")
+
+
+def bench_incremental(args):
+    """Counts detail calls per daily run for a full refresh and for INCREMENTAL_MODE's new-or-changed refresh"""
+    etl.rate_limiter = etl.TokenBucket(0, 1)
+    original_cache, etl.details_cache = etl.details_cache, None  # Cached details would hide the calls being counted
+    first_run = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    snapshot = None
+    print(f"{'run':>4}  {'mode':<12}{'movies':>8}{'detail calls':>14}{'seconds':>9}")
+    with StubTMDBServer(latency=args.latency) as server:
+        server.httpd.changed_up_to = args.changed_up_to
+        movies_list = etl.fetch_movies(max_pages=args.pages)
+        for run in range(1, args.runs + 1):
+            before = server.httpd.detail_requests
+            full, full_time = timed(etl.enrich_movie_data_parallel, movies_list, max_workers=args.workers)
+            full_calls = server.httpd.detail_requests - before
+            before = server.httpd.detail_requests
+            (incremental, snapshot, _), incremental_time = timed(
+                etl.enrich_movies_incremental, movies_list, snapshot,
+                first_run + datetime.timedelta(days=run - 1), max_workers=args.workers
+            )
+            incremental_calls = server.httpd.detail_requests - before
+
+            assert full == incremental, "incremental mode must produce the same enriched movies"
+            print(f"{run:>4}  {'full':<12}{len(full):>8}{full_calls:>14}{full_time:>9.2f}")
+            print(f"{run:>4}  {'incremental':<12}{len(incremental):>8}{incremental_calls:>14}{incremental_time:>9.2f}")
+    etl.details_cache = original_cache
+
+
+def synthetic_records(count):
+    """Builds enriched rows like the transform stage's input, without any HTTP"""
+    movies = []
+    for movie_id in range(1, count + 1):
+        details = etl.parse_movie_details(movie_id, stub_movie_details(movie_id))
+        if movie_id % 10 == 0:
+            details["budget"] = None  # Leave some gaps for imputation
+        movies.append(details)
+    return movies
+
+
+def synthetic_movies(count):
+    """Builds transformed rows like the pipeline's output, without any HTTP"""
+    return etl.clean_transform_data(synthetic_records(count))
+
+
+# Columns each query in Athena_Analytics_Queries.sql references
+SAMPLE_QUERY_COLUMNS = {
+    "Revenue Trends by Year": ["release_year", "revenue"],
+    "Top 10 Most Profitable Movies": ["title", "revenue", "budget", "profit"],
+    "ROI Analysis by Genre": ["genres", "roi", "profit"],
+}
+
+
+def bench_storage(args):
+    """Compares bytes Athena scans per sample query for CSV and Parquet output"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    movies = synthetic_movies(args.rows)
+    csv_bytes = len(etl.serialize_csv(movies).encode("utf-8"))
+    sizes = {"csv": csv_bytes}
+    column_bytes = {}
+    for compression in ("snappy", "zstd"):
+        body = etl.serialize_columnar(movies, "parquet", compression)
+        sizes[f"parquet/{compression}"] = len(body)
+        metadata = pq.ParquetFile(pa.BufferReader(body)).metadata
+        column_bytes[compression] = {}
+        for row_group in range(metadata.num_row_groups):
+            for index in range(metadata.num_columns):
+                chunk = metadata.row_group(row_group).column(index)
+                column_bytes[compression][chunk.path_in_schema] = (
+                    column_bytes[compression].get(chunk.path_in_schema, 0) + chunk.total_compressed_size
+                )
+
+    print(f"{args.rows} rows: " + ", ".join(f"{name} {size / 1024:.0f} KiB" for name, size in sizes.items()))
+    print(f"{'query':<32}{'csv KiB':>10}{'snappy KiB':>12}{'zstd KiB':>10}{'reduction':>11}")
+    for query, columns in SAMPLE_QUERY_COLUMNS.items():
+        # CSV has no column layout, so every query scans the whole file
+        snappy = sum(column_bytes["snappy"][column] for column in columns)
+        zstd = sum(column_bytes["zstd"][column] for column in columns)
+        print(f"{query:<32}{csv_bytes / 1024:>10.0f}{snappy / 1024:>12.1f}{zstd / 1024:>10.1f}{csv_bytes / zstd:>10.0f}x")
+
+
+class StubS3Client:
+    """Accepts put_object and multipart calls, keeping only sizes and the last bytes of each object"""
+
+    def __init__(self):
+        self.sizes = {}
+        self.calls = []
+        self._tails = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append("put_object")
+        self.sizes[Key] = len(Body)
+        self._tails[Key] = Body[-64:]
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append("create_multipart_upload")
+        self.sizes[Key] = 0
+        return {"UploadId": "stub"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        self.sizes[Key] += len(Body)
+        self._tails[Key] = Body[-64:]
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+
+
+def buffered_upload(s3, movies, compression):
+    """Builds the whole CSV body in memory and PUTs it, as upload_to_s3 used to"""
+    body = etl.serialize_csv(movies).encode("utf-8")
+    if compression == "gzip":
+        body = gzip.compress(body, mtime=0)
+    s3.put_object(Bucket="bench", Key="movies.csv", Body=body)
+
+
+def streamed_upload(s3, movies, compression):
+    """Serializes rows straight into a multipart upload, as upload_to_s3 does now"""
+    etl.CSV_COMPRESSION = compression
+    with etl.S3MultipartWriter(s3, "bench", "movies.csv") as writer:
+        etl.write_output(movies, writer)
+        writer.complete()
+
+
+def bench_upload(args):
+    """Compares peak memory of buffered and streamed CSV uploads as row count grows"""
+    etl.OUTPUT_FORMAT = "csv"
+    print(f"{'rows':>8}{'compression':>13}{'object MiB':>12}{'buffered MiB':>14}{'streamed MiB':>14}{'parts':>7}")
+    for rows in args.rows:
+        movies = synthetic_movies(rows)
+        for compression in ("none", "gzip"):
+            peaks = {}
+            for name, upload in (("buffered", buffered_upload), ("streamed", streamed_upload)):
+                s3 = StubS3Client()
+                # Only count what the upload allocates on top of the rows it's given
+                tracemalloc.start()
+                upload(s3, movies, compression)
+                peaks[name] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            size = s3.sizes["movies.csv"]
+            print(f"{rows:>8}{compression:>13}{size / 2 ** 20:>12.1f}{peaks['buffered'] / 2 ** 20:>14.1f}"
+                  f"{peaks['streamed'] / 2 ** 20:>14.1f}{s3.calls.count('upload_part'):>7}")
+    etl.CSV_COMPRESSION = "none"
+
+
+def bench_batch(args):
+    """Compares memory and transform time of list-of-dicts rows and a columnar MovieBatch (Python and NumPy engines)"""
+    etl.logger.setLevel("WARNING")
+    try:
+        etl.load_numpy()
+        engines = ["python", "numpy"]
+    except ImportError:
+        engines = ["python"]
+    print(f"{'rows':>9}{'dicts MiB':>11}{'batch MiB':>11}{'from_records s':>16}{'dict transform s':>18}"
+          + "".join(f"{engine + ' transform s':>20}" for engine in engines) + f"{'to_records s':>14}")
+    for rows in args.rows:
+        # Memory: what each representation holds once built, measured in its own pass
+        gc.collect()
+        tracemalloc.start()
+        records = synthetic_records(rows)
+        dicts_bytes = tracemalloc.get_traced_memory()[0]
+        batch = etl.MovieBatch.from_records(records)
+        del records
+        gc.collect()
+        batch_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del batch
+
+        # Time, without tracemalloc's overhead
+        records = synthetic_records(rows)
+        batch, from_records_seconds = timed(etl.MovieBatch.from_records, records)
+        engine_seconds = []
+        for engine in engines:
+            etl.TRANSFORM_ENGINE = engine
+            # The transform fills columns in place, so each engine gets a fresh batch
+            cleaned_batch, seconds = timed(etl.clean_transform_batch, batch or etl.MovieBatch.from_records(records))
+            engine_seconds.append(seconds)
+            batch = None
+        _, to_records_seconds = timed(cleaned_batch.to_records)
+        _, dict_seconds = timed(etl.clean_transform_data, records)
+        print(f"{rows:>9}{dicts_bytes / 2 ** 20:>11.0f}{batch_bytes / 2 ** 20:>11.0f}{from_records_seconds:>16.2f}"
+              f"{dict_seconds:>18.2f}" + "".join(f"{seconds:>20.2f}" for seconds in engine_seconds)
+              + f"{to_records_seconds:>14.2f}")
+        del records, cleaned_batch
+    etl.TRANSFORM_ENGINE = "python"
+
+
+def bench_parallel(args):
+    """Times clean_transform_batch serially and across TRANSFORM_WORKERS processes, checking the outputs match"""
+    etl.logger.setLevel("WARNING")
+    etl.TRANSFORM_CHUNK_ROWS = args.chunk_rows
+    print(f"{'rows':>9}{'engine':>8}" + "".join(f"{f'{workers} workers s':>14}" for workers in args.workers) + f"{'identical':>11}")
+    for rows in args.rows:
+        records = synthetic_records(rows)
+        for engine in args.engines:
+            etl.TRANSFORM_ENGINE = engine
+            outputs, seconds = [], []
+            for workers in args.workers:
+                etl.TRANSFORM_WORKERS = workers
+                cleaned_batch, elapsed = timed(etl.clean_transform_batch, etl.MovieBatch.from_records(records))
+                outputs.append(etl.serialize_csv(cleaned_batch))
+                seconds.append(elapsed)
+            identical = all(output == outputs[0] for output in outputs)
+            print(f"{rows:>9}{engine:>8}" + "".join(f"{elapsed:>14.2f}" for elapsed in seconds) + f"{str(identical):>11}")
+    etl.TRANSFORM_ENGINE, etl.TRANSFORM_WORKERS = "python", 1
+
+
+def measured(func, *args):
+    """Runs func twice, returning its result, seconds taken, and peak bytes allocated (traced in the second run)"""
+    result, seconds = timed(func, *args)
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_stats(args):
+    """Compares list-based statistics.mean/median with the single-pass FeatureAccumulator"""
+    rng = random.Random(42)
+    budgets = [float(round(rng.lognormvariate(16, 1.5))) for _ in range(args.rows)]
+    ratings = [round(rng.uniform(1, 10), 3) for _ in range(args.rows)]
+
+    def list_mean():
+        values = [float(rating) for rating in ratings]
+        return statistics.mean(values)
+
+    def list_median():
+        values = [float(budget) for budget in budgets]
+        return statistics.median(values)
+
+    def streamed(values, median=None):
+        accumulator = etl.FeatureAccumulator(median, etl.TDIGEST_COMPRESSION)
+        for value in values:
+            accumulator.add(value)
+        return accumulator
+
+    def chunked(values, median=None):
+        accumulator = etl.FeatureAccumulator(median, etl.TDIGEST_COMPRESSION)
+        for start in range(0, len(values), 100000):
+            accumulator.extend(values[start:start + 100000])
+        return accumulator
+
+    print(f"{args.rows} rows")
+    print(f"{'method':<34}{'result':>22}{'seconds':>9}{'peak MiB':>10}")
+    cases = [
+        ("mean: statistics.mean(list)", list_mean),
+        ("mean: accumulator, row by row", lambda: streamed(ratings).mean()),
+        ("mean: accumulator, 100k chunks", lambda: chunked(ratings).mean()),
+        ("median: statistics.median(list)", list_median),
+        ("median: exact, row by row", lambda: streamed(budgets, "exact").median()),
+        ("median: exact, 100k chunks", lambda: chunked(budgets, "exact").median()),
+        ("median: t-digest, 100k chunks", lambda: chunked(budgets, "tdigest").median()),
+    ]
+    for name, func in cases:
+        result, seconds, peak = measured(func)
+        print(f"{name:<34}{result!r:>22}{seconds:>9.2f}{peak / 2 ** 20:>10.1f}")
+
+
+def bench_dates(args):
+    """Compares per-row strptime, the fixed-offset parser, and parsing once per distinct date in a MovieBatch"""
+    rng = random.Random(7)
+    start = datetime.date(1950, 1, 1)
+    release_dates = [(start + datetime.timedelta(days=rng.randrange(args.distinct))).isoformat() for _ in range(args.rows)]
+    for index in range(0, args.rows, 50):
+        release_dates[index] = rng.choice(["", "2020-02-30", "2021-3-7"])  # Gaps, invalid and unpadded dates
+    as_of = datetime.date.today()
+
+    def strptime_years():
+        years = []
+        for value in release_dates:
+            try:
+                years.append(datetime.datetime.strptime(value, "%Y-%m-%d").year if value else None)
+            except ValueError:
+                years.append(None)
+        return years
+
+    def sliced_years():
+        return [release_date.year if release_date else None for release_date in map(etl.parse_release_date, release_dates)]
+
+    column = etl.StringColumn.from_values(release_dates)
+
+    def batch_features():
+        lookup = etl._date_feature_lookup(column, as_of)
+        return {name: [values[code] for code in column.codes] for name, (values, _) in lookup.items()}
+
+    print(f"{args.rows} rows, {len(column.dictionary) - 2} distinct values, DATE_FEATURES={etl.DATE_FEATURES}")
+    baseline, baseline_seconds = timed(strptime_years)
+    print(f"{'strptime per row':<32}{baseline_seconds:>8.2f}s{1:>8.1f}x")
+    for name, func in (("fixed-offset per row", sliced_years), ("batch, once per distinct date", batch_features)):
+        result, seconds = timed(func)
+        years = result["release_year"] if isinstance(result, dict) else result
+        assert [int(year) if year else None for year in years] == baseline
+        print(f"{name:<32}{seconds:>8.2f}s{baseline_seconds / seconds:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    extraction = subparsers.add_parser("extraction", help=bench_extraction.__doc__)
+    extraction.add_argument("--pages", type=int, default=20)
+    extraction.add_argument("--latency", type=float, default=0.05, help="Stub server latency per request (s)")
+    extraction.add_argument("--concurrency", type=int, default=etl.EXTRACTION_CONCURRENCY)
+    extraction.add_argument("--rate-limit", type=float, default=etl.TMDB_RATE_LIMIT, help="0 disables limiting")
+    extraction.set_defaults(func=bench_extraction)
+
+    pipeline = subparsers.add_parser("pipeline", help=bench_pipeline.__doc__)
+    pipeline.add_argument("--pages", type=int, default=10)
+    pipeline.add_argument("--latency", type=float, default=0.05, help="Stub server latency per request (s)")
+    pipeline.add_argument("--max-details", type=int, default=None)
+    pipeline.add_argument("--workers", type=int, default=etl.MAX_WORKERS)
+    pipeline.add_argument("--queue-size", type=int, default=etl.STREAM_QUEUE_SIZE)
+    pipeline.add_argument("--rate-limit", type=float, default=0, help="0 (the default) disables limiting")
+    pipeline.set_defaults(func=bench_pipeline)
+
+    transport = subparsers.add_parser("transport", help=bench_transport.__doc__)
+    transport.add_argument("--pages", type=int, default=10)
+    transport.add_argument("--latency", type=float, default=0.0, help="Stub server latency per request (s)")
+    transport.add_argument("--workers", type=int, default=etl.MAX_WORKERS)
+    transport.add_argument("--rate-limit", type=float, default=0, help="0 (the default) disables limiting")
+    transport.set_defaults(func=bench_transport)
+
+    concurrency = subparsers.add_parser("concurrency", help=bench_concurrency.__doc__)
+    concurrency.add_argument("--movies", type=int, default=300)
+    concurrency.add_argument("--latency", type=float, default=0.02, help="Stub server latency per request (s)")
+    concurrency.add_argument("--capacity", type=int, default=8, help="Concurrent requests before the stub returns 429")
+    concurrency.add_argument("--workers", type=int, default=16, help="Fixed pool size, and the adaptive starting point")
+    concurrency.add_argument("--max-concurrency", type=int, default=etl.MAX_CONCURRENCY)
+    concurrency.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds sent with 429s")
+    concurrency.set_defaults(func=bench_concurrency)
+
+    incremental = subparsers.add_parser("incremental", help=bench_incremental.__doc__)
+    incremental.add_argument("--pages", type=int, default=10)
+    incremental.add_argument("--runs", type=int, default=3, help="Consecutive daily runs")
+    incremental.add_argument("--latency", type=float, default=0.0, help="Stub server latency per request (s)")
+    incremental.add_argument("--workers", type=int, default=etl.MAX_WORKERS)
+    incremental.add_argument("--changed-up-to", type=int, default=100,
+                             help="/movie/changes reports every 7th movie ID up to this one")
+    incremental.set_defaults(func=bench_incremental)
+
+    storage = subparsers.add_parser("storage", help=bench_storage.__doc__)
+    storage.add_argument("--rows", type=int, default=100000)
+    storage.set_defaults(func=bench_storage)
+
+    upload = subparsers.add_parser("upload", help=bench_upload.__doc__)
+    upload.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 100000])
+    upload.set_defaults(func=bench_upload)
+
+    batch = subparsers.add_parser("batch", help=bench_batch.__doc__)
+    batch.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    batch.set_defaults(func=bench_batch)
+
+    parallel = subparsers.add_parser("parallel", help=bench_parallel.__doc__)
+    parallel.add_argument("--rows", type=int, nargs="+", default=[1000000])
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parallel.add_argument("--chunk-rows", type=int, default=etl.TRANSFORM_CHUNK_ROWS)
+    parallel.add_argument("--engines", nargs="+", default=["python", "numpy"])
+    parallel.set_defaults(func=bench_parallel)
+
+    stats = subparsers.add_parser("stats", help=bench_stats.__doc__)
+    stats.add_argument("--rows", type=int, default=1000000)
+    stats.set_defaults(func=bench_stats)
+
+    dates = subparsers.add_parser("dates", help=bench_dates.__doc__)
+    dates.add_argument("--rows", type=int, default=1000000)
+    dates.add_argument("--distinct", type=int, default=25000, help="Days the release dates are drawn from")
+    dates.set_defaults(func=bench_dates)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
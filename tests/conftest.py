@@ -0,0 +1,84 @@
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tmdb_etl_lambda as etl  # noqa: E402
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client calls the pipeline makes"""
+
+    class exceptions:
+        NoSuchKey = NoSuchKey
+
+    def __init__(self):
+        self.objects = {}
+        self._uploads = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = bytes(Body)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        if Key not in self.objects:
+            raise NoSuchKey(Key)
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._uploads[Key] = b""
+        return {"UploadId": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._uploads[Key] += bytes(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.objects[Key] = self._uploads.pop(Key)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(Key, None)
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        if CopySource["Key"] not in self.objects:
+            raise NoSuchKey(CopySource["Key"])
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+    def list_objects_v2(self, Bucket, Prefix, **kwargs):
+        return {
+            "Contents": [
+                {"Key": key, "Size": len(body), "ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+                for key, body in sorted(self.objects.items()) if key.startswith(Prefix)
+            ],
+            "IsTruncated": False
+        }
+
+
+@pytest.fixture
+def s3(monkeypatch, tmp_path):
+    """A fresh fake S3 and local state store, with CSV output and the stateful features off"""
+    fake = FakeS3()
+    monkeypatch.setattr(etl.boto3, "client", lambda *args, **kwargs: fake)
+    monkeypatch.setattr(etl, "state_store", etl.LocalDirectoryStore(str(tmp_path / "state")))
+    monkeypatch.setattr(etl, "OUTPUT_FORMAT", "csv")
+    monkeypatch.setattr(etl, "CSV_COMPRESSION", "none")
+    monkeypatch.setattr(etl, "OUTPUT_PREFIX", "daily_outputs")
+    monkeypatch.setattr(etl, "OUTPUT_PARTITIONING", "flat")
+    monkeypatch.setattr(etl, "CURRENT_STATE_PREFIX", "current_state")
+    for flag in ("CHANGE_DETECTION", "CURRENT_STATE_MERGE", "ROLLUPS", "BRIDGE_TABLES", "INCREMENTAL_MODE"):
+        monkeypatch.setattr(etl, flag, False)
+    return fake
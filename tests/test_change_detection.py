@@ -0,0 +1,35 @@
+import tmdb_etl_lambda as etl
+
+
+class CountingStore(etl.LocalDirectoryStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.puts = []
+
+    def put(self, key, value):
+        self.puts.append(key)
+        super().put(key, value)
+
+
+def movie(movie_id, budget=1000000):
+    return {'movie_id': movie_id, 'title': f'Movie {movie_id}', 'budget': budget}
+
+
+def test_save_writes_only_the_buckets_with_new_or_changed_fingerprints(tmp_path):
+    store = CountingStore(str(tmp_path))
+    first = etl.ChangeDetector(store, buckets=4)
+    first.classify([movie(i) for i in range(8)])
+    first.save()
+    assert sorted(store.puts) == [f"fingerprints/{bucket}" for bucket in range(4)]
+
+    store.puts.clear()
+    second = etl.ChangeDetector(store, buckets=4)
+    changed = second.classify([movie(i, budget=2000000 if i == 5 else 1000000) for i in range(8)])
+    second.save()
+
+    assert changed == [5]
+    assert second.snapshot() == {"new": 0, "changed": 1, "unchanged": 7}
+    assert store.puts == ["fingerprints/1"]
+
+    third = etl.ChangeDetector(store, buckets=4)
+    assert third.classify([movie(5, budget=2000000)]) == []
@@ -0,0 +1,48 @@
+import pytest
+
+import tmdb_etl_lambda as etl
+
+
+class Context:
+    """Lambda context with a fixed amount of time left"""
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+@pytest.fixture
+def chunks(monkeypatch):
+    """Lists 120 movies and records the ID chunks details are fetched in"""
+    calls = []
+    monkeypatch.setattr(etl, "EXTRACTION_MODE", "async")
+    monkeypatch.setattr(etl, "fetch_movies_async",
+                        lambda max_pages, concurrency: [{'movie_id': movie_id} for movie_id in range(1, 121)])
+
+    def fetch_details_parallel(movie_ids, max_workers=5, concurrency_controller=None):
+        calls.append(len(movie_ids))
+        return {movie_id: {'movie_id': movie_id, 'budget': 1} for movie_id in movie_ids}
+
+    monkeypatch.setattr(etl, "fetch_details_parallel", fetch_details_parallel)
+    return calls
+
+
+def test_without_a_context_details_are_fetched_in_one_pool(chunks):
+    enriched, checkpoint = etl.extract_and_enrich_resumable(None, chunk_size=50)
+
+    assert checkpoint is None
+    assert len(enriched) == 120
+    assert chunks == [120]
+
+
+def test_a_short_deadline_checkpoints_between_chunks_and_resumes(chunks):
+    enriched, checkpoint = etl.extract_and_enrich_resumable(Context(1000), chunk_size=50, safety_ms=5000)
+    assert enriched is None
+    assert (checkpoint["stage"], len(checkpoint["details"])) == ("enrich", 50)
+
+    enriched, checkpoint = etl.extract_and_enrich_resumable(Context(600000), checkpoint, chunk_size=50, safety_ms=5000)
+    assert checkpoint is None
+    assert [movie['movie_id'] for movie in enriched] == list(range(1, 121))
+    assert chunks == [50, 50, 20]
@@ -0,0 +1,59 @@
+import io
+from datetime import date
+
+import pytest
+
+import tmdb_etl_lambda as etl
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def write_day(day, movie_ids):
+    etl.upload_to_s3([{'movie_id': movie_id, 'title': f'Movie {movie_id}'} for movie_id in movie_ids],
+                     file_stem=f"{etl.OUTPUT_PREFIX}/movies_data_{day:%Y-%m-%d}")
+
+
+def compacted_rows(s3):
+    """Rows of every file the symlink manifest lists, in manifest order"""
+    symlink = s3.objects[f"{etl.COMPACTED_PREFIX}/_symlink/symlink.txt"].decode("utf-8")
+    rows = []
+    for url in symlink.split():
+        key = url.split(f"s3://{etl.S3_BUCKET_NAME}/", 1)[1]
+        rows.extend(pq.read_table(io.BytesIO(s3.objects[key])).to_pylist())
+    return [(row['dt'], row['movie_id']) for row in rows]
+
+
+def test_compaction_sorts_days_by_movie_id_behind_the_manifest(s3):
+    write_day(date(2025, 3, 1), [3, 1, 2])
+    write_day(date(2025, 3, 2), [5, 4])
+
+    result = etl.compact_daily_outputs(date(2025, 3, 1), date(2025, 3, 2))
+
+    assert (result["files_read"], result["rows"]) == (2, 5)
+    assert compacted_rows(s3) == [('2025-03-01', 1), ('2025-03-01', 2), ('2025-03-01', 3),
+                                  ('2025-03-02', 4), ('2025-03-02', 5)]
+
+
+def test_a_covering_range_replaces_and_later_deletes_the_files_it_swaps_out(s3):
+    for day in range(1, 5):
+        write_day(date(2025, 3, day), [day])
+    first = etl.compact_daily_outputs(date(2025, 3, 1), date(2025, 3, 2))
+    old_files = etl.state_store.get(etl.COMPACTION_MANIFEST_KEY)["ranges"][first["range"]]["files"]
+
+    etl.compact_daily_outputs(date(2025, 3, 1), date(2025, 3, 4))
+    assert compacted_rows(s3) == [(f'2025-03-0{day}', day) for day in range(1, 5)]
+    assert all(key in s3.objects for key in old_files)  # Queries started before the swap may still read them
+
+    result = etl.compact_daily_outputs(date(2025, 3, 5), date(2025, 3, 5))
+    assert result["files_written"] == 0
+    etl.compact_daily_outputs(date(2025, 3, 1), date(2025, 3, 4))
+    assert not any(key in s3.objects for key in old_files)
+
+
+def test_a_range_cutting_a_compacted_range_in_two_is_refused(s3):
+    for day in range(1, 4):
+        write_day(date(2025, 3, day), [day])
+    etl.compact_daily_outputs(date(2025, 3, 1), date(2025, 3, 2))
+
+    with pytest.raises(ValueError, match="partly overlaps"):
+        etl.compact_daily_outputs(date(2025, 3, 2), date(2025, 3, 3))
@@ -0,0 +1,46 @@
+import io
+
+import tmdb_etl_lambda as etl
+
+
+def movie(movie_id, **fields):
+    return {'movie_id': movie_id, 'title': f'Movie {movie_id}', 'budget': 1000000, 'original_language': 'en', **fields}
+
+
+def table(s3):
+    """Every row of the current-state table, keyed by movie_id"""
+    rows = {}
+    for key, body in s3.objects.items():
+        if key.startswith(f"{etl.CURRENT_STATE_PREFIX}/bucket="):
+            rows.update({int(row['movie_id']): row for row in etl.read_output(io.BytesIO(body))})
+    return rows
+
+
+def test_merge_inserts_then_updates_then_leaves_unchanged_rows_alone(s3):
+    stats = etl.merge_current_state([movie(i) for i in range(1, 21)], buckets=4)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"], stats["buckets_rewritten"]) == (20, 0, 0, 4)
+
+    stats = etl.merge_current_state([movie(4, title='Renamed'), movie(5), movie(21)], buckets=4)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 1)
+    # Movies 4 and 5 share bucket 0, movie 21 lands in bucket 1; buckets 2 and 3 aren't touched
+    assert stats["buckets_rewritten"] == 2
+    rows = table(s3)
+    assert len(rows) == 21
+    assert rows[4]['title'] == 'Renamed'
+    assert rows[5]['title'] == 'Movie 5'
+
+    before = dict(s3.objects)
+    stats = etl.merge_current_state([movie(4, title='Renamed'), movie(21)], buckets=4)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"], stats["buckets_rewritten"]) == (0, 0, 2, 0)
+    assert s3.objects == before
+
+
+def test_merge_reports_each_upsert_with_the_row_it_replaces(s3):
+    etl.merge_current_state([movie(1), movie(2)], buckets=2)
+    changes = []
+    etl.merge_current_state([movie(1, budget=5), movie(2), movie(3)], buckets=2,
+                            on_change=lambda previous, new: changes.append((previous, new)))
+
+    assert [(previous and int(previous['movie_id']), new['movie_id']) for previous, new in changes] == [(1, 1), (None, 3)]
+    assert changes[0][0]['budget'] == '1000000'  # As stored in the CSV bucket file
+    assert changes[0][1]['budget'] == 5
@@ -0,0 +1,20 @@
+import tmdb_etl_lambda as etl
+
+
+class FailingWrites(etl.LocalDirectoryStore):
+    location = "failing"
+
+    def put(self, key, value):
+        raise OSError("No space left on device")
+
+
+def test_a_failed_cache_write_keeps_the_fetched_details(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, "details_cache", etl.DetailsCache(FailingWrites(str(tmp_path)), ttl_seconds=60))
+    monkeypatch.setattr(etl, "make_api_request", lambda url, **kwargs: (200, {"ETag": '"v1"'}, {
+        "id": 7, "title": "Movie 7", "budget": 1000, "revenue": 2000, "runtime": 90
+    }))
+
+    details = etl.fetch_movie_details(7)
+
+    assert (details['movie_id'], details['title'], details['budget']) == (7, "Movie 7", 1000)
+    assert etl.details_cache.snapshot()["misses"] == 1
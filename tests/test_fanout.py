@@ -0,0 +1,51 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import tmdb_etl_lambda as etl
+
+
+@pytest.fixture
+def shards(s3, monkeypatch):
+    """Runs 'lambda' shards in this process, failing the shard numbers added to the returned set"""
+    failing = set()
+    monkeypatch.setattr(etl, "fetch_details_parallel",
+                        lambda movie_ids, max_workers=5: {movie_id: {'movie_id': movie_id, 'budget': 1} for movie_id in movie_ids})
+
+    def invoker(function_name):
+        def invoke(shard_event):
+            if shard_event["shard"] in failing:
+                raise Exception(f"Shard {shard_event['shard']} failed: Task timed out")
+            return etl.run_fanout_shard(shard_event)
+        return invoke
+
+    monkeypatch.setattr(etl, "_invoke_fanout_shard_lambda", invoker)
+    return failing
+
+
+def test_fanout_merges_every_shard_in_listing_order(shards):
+    listing = [{'movie_id': movie_id} for movie_id in range(10, 0, -1)]
+    enriched, stats = etl.enrich_movies_fanout(listing, SimpleNamespace(function_name="etl"), shards=3)
+
+    assert [movie['movie_id'] for movie in enriched] == list(range(10, 0, -1))
+    assert all(movie['budget'] == 1 for movie in enriched)
+    assert stats["shards"] == 3
+
+
+def test_a_failed_shard_fails_the_run(shards):
+    shards.add(1)
+    with pytest.raises(Exception, match=r"shard\(s\) \[1\]"):
+        etl.enrich_movies_fanout([{'movie_id': movie_id} for movie_id in range(1, 11)],
+                                 SimpleNamespace(function_name="etl"), shards=3)
+
+
+def test_lambda_shards_need_the_s3_state_store(s3, monkeypatch):
+    monkeypatch.setattr(etl, "PIPELINE_MODE", "fanout")
+    monkeypatch.setattr(etl, "FANOUT_EXECUTOR", "lambda")
+    monkeypatch.setattr(etl, "STATE_STORE", "local")
+
+    response = etl.lambda_handler({}, SimpleNamespace(function_name="etl"))
+
+    assert response["statusCode"] == 500
+    assert "STATE_STORE=s3" in json.loads(response["body"])["error"]
@@ -0,0 +1,51 @@
+import pytest
+
+import tmdb_etl_lambda as etl
+
+
+class CountingStore(etl.LocalDirectoryStore):
+    def __init__(self, root):
+        super().__init__(root)
+        self.reads = []
+
+    def get(self, key):
+        self.reads.append(key)
+        return super().get(key)
+
+
+@pytest.fixture(autouse=True)
+def long_run(monkeypatch):
+    monkeypatch.setattr(etl, "IMPUTATION_STATS", "long_run")
+
+
+def run(store, movies):
+    state = etl.ImputationState.load(store)
+    stats = etl.calculate_statistics([dict(movie) for movie in movies], state)
+    state.save(store)
+    return state, stats
+
+
+def test_each_movie_is_counted_once_per_feature(tmp_path):
+    store = etl.LocalDirectoryStore(str(tmp_path))
+    run(store, [{'movie_id': 1, 'vote_average': 8.0}, {'movie_id': 2, 'vote_average': 6.0, 'budget': 100.0}])
+    # Movie 1's details arrive a run later: its budget is counted, its vote_average not again
+    state, stats = run(store, [{'movie_id': 1, 'vote_average': 9.0, 'budget': 300.0}])
+
+    assert state.accumulators['vote_average'].count == 2
+    assert stats['vote_average'] == 7.0
+    assert state.accumulators['budget'].count == 2
+    assert state.snapshot() == {"movies": 2, "new_movies": 0}
+
+
+def test_a_run_reads_only_the_id_spans_of_its_movies(tmp_path):
+    span = etl.IMPUTATION_ID_SPAN
+    store = CountingStore(str(tmp_path))
+    run(store, [{'movie_id': movie_id, 'runtime': 90} for movie_id in range(1, 10 * span)])
+
+    store.reads.clear()
+    state, _ = run(store, [{'movie_id': span + 1, 'runtime': 90}, {'movie_id': 20 * span, 'runtime': 100}])
+
+    assert sorted(key for key in store.reads if key.startswith("imputation/movies/")) == \
+        sorted([f"imputation/movies/{span}", f"imputation/movies/{20 * span}"])
+    assert state.new_movies == 1
+    assert all(len(store.get(f"imputation/movies/{start}")) <= span for start in range(0, 10 * span, span))
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import tmdb_etl_lambda as etl
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Records the IDs each run fetches details for; /movie/changes reports movie 7"""
+    calls = []
+
+    def fetch_details_parallel(movie_ids, max_workers=5, concurrency_controller=None):
+        calls.append(sorted(movie_ids))
+        return {movie_id: {'movie_id': movie_id, 'budget': movie_id * 10} for movie_id in movie_ids}
+
+    monkeypatch.setattr(etl, "fetch_details_parallel", fetch_details_parallel)
+    monkeypatch.setattr(etl, "fetch_changed_movie_ids", lambda since, until: {7})
+    return calls
+
+
+def test_snapshot_keeps_only_the_current_listing(fetched):
+    snapshot = None
+    first_run = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    for day in range(4):
+        # The listing drifts by ten movies a day
+        listing = [{'movie_id': movie_id} for movie_id in range(1 + 10 * day, 51 + 10 * day)]
+        enriched, snapshot, stats = etl.enrich_movies_incremental(listing, snapshot, first_run + timedelta(days=day))
+        assert [movie['budget'] for movie in enriched] == [movie['movie_id'] * 10 for movie in listing]
+        assert sorted(map(int, snapshot["details"])) == [movie['movie_id'] for movie in listing]
+
+    assert fetched[0] == list(range(1, 51))
+    assert fetched[1] == list(range(51, 61))  # Movie 7 changed, but it is no longer listed by day 2
+    assert fetched[3] == list(range(71, 81))
+
+
+def test_changed_movies_are_fetched_again(fetched):
+    listing = [{'movie_id': movie_id} for movie_id in range(1, 11)]
+    _, snapshot, _ = etl.enrich_movies_incremental(listing, None, datetime(2025, 3, 1, tzinfo=timezone.utc))
+    _, _, stats = etl.enrich_movies_incremental(listing, snapshot, datetime(2025, 3, 2, tzinfo=timezone.utc))
+
+    assert fetched[1] == [7]
+    assert (stats["details_fetched"], stats["details_carried_over"]) == (1, 9)
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+
+import pytest
+
+import tmdb_etl_lambda as etl
+
+
+def movie(movie_id, budget=1000000):
+    return {
+        'movie_id': movie_id, 'title': f'Movie {movie_id}', 'budget': budget, 'revenue': 5000000,
+        'vote_average': 7.5, 'vote_count': 30, 'popularity': 50.0, 'runtime': 90, 'release_date': '2020-01-01',
+        'genres': 'Action, War', 'original_language': 'en'
+    }
+
+
+@pytest.fixture
+def run(s3, monkeypatch):
+    """Runs lambda_handler over the given movies, as if extraction had returned them"""
+    monkeypatch.setattr(etl, "CURRENT_STATE_MERGE", True)
+    monkeypatch.setattr(etl, "CURRENT_STATE_BUCKETS", 8)
+
+    def run_with(movies):
+        monkeypatch.setattr(etl, "extract_and_enrich_resumable", lambda *args, **kwargs: ([dict(m) for m in movies], None))
+        return etl.lambda_handler({}, None)
+
+    return run_with
+
+
+def published(s3):
+    rows = csv.DictReader(io.StringIO(s3.objects[etl.ROLLUPS_KEY].decode("utf-8")))
+    return {(row["dimension"], row["value"]): row for row in rows}
+
+
+def test_apply_moves_a_changed_row_between_groups_exactly():
+    rollups = etl.Rollups()
+    before, after = movie(1, budget=0.1), dict(movie(1, budget=0.2), original_language='fr')
+    rollups.apply(None, movie(2, budget=0.3))
+    rollups.apply(None, before)
+    rollups.apply(before, after)
+
+    rows = {(row["dimension"], row["value"]): row for row in rollups.rows()}
+    assert rows[("original_language", "en")]["movies"] == 1
+    assert rows[("original_language", "en")]["budget_sum"] == 0.3
+    assert rows[("original_language", "fr")]["budget_sum"] == 0.2
+    assert rows[("genres", "Action")]["movies"] == 2
+    assert rows[("genres", "Action")]["budget_sum"] == 0.5
+
+    for _ in range(10):
+        rollups.apply(after, before)
+        rollups.apply(before, after)
+    rollups.apply(after, before)
+    rows = {(row["dimension"], row["value"]): row for row in rollups.rows()}
+    assert ("original_language", "fr") not in rows
+    assert rows[("original_language", "en")]["budget_sum"] == 0.4  # Exact: 0.1 + 0.3 with no residue from the moves
+
+
+def test_rollups_enabled_on_an_existing_table_start_from_its_rows(run, s3, monkeypatch):
+    assert run([movie(i) for i in range(1, 51)])["statusCode"] == 200
+
+    monkeypatch.setattr(etl, "ROLLUPS", True)
+    response = run([movie(i, budget=1000000 + (i <= 10)) for i in range(1, 51)])
+
+    assert response["statusCode"] == 200
+    group = published(s3)[("original_language", "en")]
+    assert group["movies"] == "50"
+    assert float(group["budget_sum"]) == 50 * 1000000 + 10
+
+
+def test_a_run_that_dies_after_the_merge_leaves_rollups_consistent(run, s3, monkeypatch):
+    monkeypatch.setattr(etl, "ROLLUPS", True)
+    assert run([movie(i) for i in range(1, 51)])["statusCode"] == 200
+
+    def merge_then_die(*args, **kwargs):
+        merge_current_state(*args, **kwargs)
+        raise RuntimeError("lost before the rollups were saved")
+
+    merge_current_state = etl.merge_current_state
+    monkeypatch.setattr(etl, "merge_current_state", merge_then_die)
+    changed = [movie(i, budget=1001000) for i in range(1, 51)]
+    assert run(changed)["statusCode"] == 500
+
+    monkeypatch.setattr(etl, "merge_current_state", merge_current_state)
+    response = run(changed)
+
+    assert json.loads(response["body"])["current_state"]["unchanged"] == 50
+    assert float(published(s3)[("original_language", "en")]["budget_sum"]) == 50 * 1001000
+
+
+def test_a_failed_publish_is_caught_up_by_the_next_run(run, s3, monkeypatch):
+    monkeypatch.setattr(etl, "ROLLUPS", True)
+    assert run([movie(i) for i in range(1, 51)])["statusCode"] == 200
+
+    publish = etl.Rollups.publish
+    monkeypatch.setattr(etl.Rollups, "publish", lambda self: (_ for _ in ()).throw(RuntimeError("S3 unavailable")))
+    changed = [movie(i, budget=1001000) for i in range(1, 51)]
+    assert run(changed)["statusCode"] == 500
+
+    monkeypatch.setattr(etl.Rollups, "publish", publish)
+    assert run(changed)["statusCode"] == 200
+    assert float(published(s3)[("original_language", "en")]["budget_sum"]) == 50 * 1001000
@@ -0,0 +1,102 @@
+import http.client
+import urllib.error
+
+import pytest
+
+import tmdb_etl_lambda as etl
+
+URL = "https://api.themoviedb.org/3/movie/1"
+
+
+class FakeResponse:
+    status, reason, will_close = 200, "OK", False
+
+    def __init__(self, body=b"{}", error=None):
+        self.headers = {}
+        self._body, self._error = body, error
+
+    def read(self):
+        if self._error:
+            raise self._error
+        return self._body
+
+
+class FakeConnection:
+    """Fails request() or getresponse() with the given errors in order, then answers"""
+
+    def __init__(self, *errors, response=None):
+        self.errors = list(errors)
+        self.response = response or FakeResponse()
+        self.requests = 0
+        self.closed = False
+
+    def request(self, method, path, headers=None):
+        self.requests += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def getresponse(self):
+        return self.response
+
+    def close(self):
+        self.closed = True
+
+
+class CountingBucket:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """A transport with one stale pooled connection, whose fresh connections come from `fresh`"""
+    monkeypatch.setattr(etl, "rate_limiter", CountingBucket())
+    transport = etl.PooledHTTPTransport()
+    transport.fresh = []
+    monkeypatch.setattr(transport, "_connect", lambda *key: transport.fresh.pop(0))
+    return transport
+
+
+def pool(transport, connection):
+    transport._checkin(("https", "api.themoviedb.org", None), connection)
+
+
+@pytest.mark.parametrize("error", [http.client.RemoteDisconnected("closed"), ConnectionResetError(), BrokenPipeError()])
+def test_a_stale_pooled_connection_is_retried_once_through_the_rate_limiter(transport, error):
+    pool(transport, FakeConnection(error))
+    transport.fresh.append(FakeConnection())
+
+    assert transport.get(URL)[0] == 200
+    assert etl.rate_limiter.acquired == 1
+
+
+def test_a_timeout_on_a_pooled_connection_is_not_retried(transport):
+    stale = FakeConnection(TimeoutError("timed out"))
+    pool(transport, stale)
+    transport.fresh.append(FakeConnection())
+
+    with pytest.raises(urllib.error.URLError):
+        transport.get(URL)
+    assert stale.closed and len(transport.fresh) == 1
+    assert etl.rate_limiter.acquired == 0
+
+
+def test_a_reset_while_reading_the_body_is_not_retried(transport):
+    pool(transport, FakeConnection(response=FakeResponse(error=ConnectionResetError())))
+    transport.fresh.append(FakeConnection())
+
+    with pytest.raises(urllib.error.URLError):
+        transport.get(URL)
+    assert len(transport.fresh) == 1
+
+
+def test_a_fresh_connection_is_not_retried(transport):
+    transport.fresh.append(FakeConnection(ConnectionResetError()))
+    transport.fresh.append(FakeConnection())
+
+    with pytest.raises(urllib.error.URLError):
+        transport.get(URL)
+    assert len(transport.fresh) == 1
@@ -1,16 +1,34 @@
+import asyncio
+import bisect
 import boto3
+from botocore.config import Config
+import gzip
+import hashlib
+import http.client
 import json
+import math
+import operator
 import os
+import queue
+import sqlite3
+import random
+import re
+import threading
 import time
+import uuid
 import urllib.request
 import urllib.error
 import urllib.parse
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, repeat, tee
 import logging
+import io
 from io import StringIO
 import csv
-from datetime import datetime
-import statistics
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 
 # Configure logging
 logger = logging.getLogger()
@@ -20,6 +38,53 @@ logger.setLevel(logging.INFO)
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', "2025tmdbmoviedata")
 S3_FILE_NAME = os.environ.get('S3_FILE_NAME', "movies_data_enriched.csv")
 
+# Transform: 'numpy' vectorizes imputation and feature engineering over the columnar batch
+TRANSFORM_ENGINE = os.environ.get('TRANSFORM_ENGINE', 'python')  # 'python' or 'numpy' (needs a NumPy layer)
+TRANSFORM_WORKERS = int(os.environ.get('TRANSFORM_WORKERS', 1))  # Processes for batches over TRANSFORM_CHUNK_ROWS rows
+TRANSFORM_CHUNK_ROWS = int(os.environ.get('TRANSFORM_CHUNK_ROWS', 100000))  # Rows per statistics chunk / parallel shard
+DATE_FEATURES = os.environ.get('DATE_FEATURES', 'false').lower() == 'true'  # Adds release_month/quarter, days_since_release
+MEDIAN_ESTIMATOR = os.environ.get('MEDIAN_ESTIMATOR', 'exact')  # 'exact' or 'tdigest' (approximate, bounded memory)
+TDIGEST_COMPRESSION = int(os.environ.get('TDIGEST_COMPRESSION', 100))  # More centroids: more accurate, more memory
+IMPUTATION_STATS = os.environ.get('IMPUTATION_STATS', 'run')  # 'run' or 'long_run' (accumulated across runs in the state store)
+IMPUTATION_ID_SPAN = int(os.environ.get('IMPUTATION_ID_SPAN', 1024))  # movie_ids per seen-set document; fixed once state is written
+IMPUTATION_STATS_KEY = "imputation/stats"
+
+# Output format: columnar formats need pyarrow (e.g. the AWS SDK for pandas Lambda layer)
+OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'csv')  # 'csv', 'parquet' or 'orc'
+OUTPUT_COMPRESSION = os.environ.get('OUTPUT_COMPRESSION', 'snappy')  # Parquet: snappy, zstd or gzip; ORC: snappy, zstd or zlib
+OUTPUT_PREFIX = os.environ.get('OUTPUT_PREFIX', 'daily_outputs' if OUTPUT_FORMAT == 'csv' else f'daily_outputs_{OUTPUT_FORMAT}')
+PARQUET_ROW_GROUP_SIZE = int(os.environ.get('PARQUET_ROW_GROUP_SIZE', 100000))  # Rows per Parquet row group
+OUTPUT_PARTITIONING = os.environ.get('OUTPUT_PARTITIONING', 'flat')  # 'flat', 'date' (dt=YYYY-MM-DD/) or 'date_release_year'
+CSV_COMPRESSION = os.environ.get('CSV_COMPRESSION', 'none')  # 'none', 'gzip' or 'zstd' (needs a zstandard layer)
+UPLOAD_PART_SIZE = int(os.environ.get('UPLOAD_PART_SIZE_MB', 8)) * 1024 * 1024  # Multipart part size; S3's minimum is 5 MiB
+UPLOAD_CHUNK_ROWS = int(os.environ.get('UPLOAD_CHUNK_ROWS', 1000))  # CSV rows serialized per write to the upload stream
+
+# Current-state table: daily outputs stay the append-only history, and each movie's latest row is upserted here
+CURRENT_STATE_MERGE = os.environ.get('CURRENT_STATE_MERGE', 'false').lower() == 'true'
+CURRENT_STATE_PREFIX = os.environ.get('CURRENT_STATE_PREFIX', 'current_state' if OUTPUT_FORMAT == 'csv' else f'current_state_{OUTPUT_FORMAT}')
+CURRENT_STATE_BUCKETS = int(os.environ.get('CURRENT_STATE_BUCKETS', 64))  # One file per movie_id % buckets; fixed once data is written
+
+# Change detection: row fingerprints and output digests kept in the state store, bucketed like the current-state table
+CHANGE_DETECTION = os.environ.get('CHANGE_DETECTION', 'false').lower() == 'true'
+DAILY_OUTPUT_ROWS = os.environ.get('DAILY_OUTPUT_ROWS', 'all')  # 'all', or 'changed' for new and changed movies only
+FINGERPRINT_EXCLUDED_FIELDS = {'days_since_release'}  # Changes every day without the movie changing
+
+# Compaction (compaction_handler): daily outputs merged into large sorted Parquet files listed by a symlink manifest
+COMPACTED_PREFIX = os.environ.get('COMPACTED_PREFIX', 'compacted')
+COMPACTION_TARGET_MB = int(os.environ.get('COMPACTION_TARGET_MB', 128))  # Approximate size of each compacted file
+COMPACTION_COMPRESSION = os.environ.get('COMPACTION_COMPRESSION', 'zstd')  # snappy, zstd or gzip
+COMPACTION_MANIFEST_KEY = "compaction/manifest"
+
+# Rollups: per year/genre/language/popularity_category aggregates kept in step with the current-state table
+ROLLUPS = os.environ.get('ROLLUPS', 'false').lower() == 'true'  # Needs CURRENT_STATE_MERGE
+ROLLUPS_KEY = os.environ.get('ROLLUPS_KEY', 'rollups/movie_rollups.csv')  # S3 key of the published rollup table
+ROLLUP_SKETCH_ACCURACY = float(os.environ.get('ROLLUP_SKETCH_ACCURACY', 0.01))  # Relative error of rollup quantiles
+ROLLUPS_STATE_KEY = "rollups/state"
+
+# Bridge tables: movie -> genre/keyword/company rows by TMDB id, plus dimension tables naming the ids
+BRIDGE_TABLES = os.environ.get('BRIDGE_TABLES', 'false').lower() == 'true'
+BRIDGE_PREFIX = os.environ.get('BRIDGE_PREFIX', 'bridges' if OUTPUT_FORMAT == 'csv' else f'bridges_{OUTPUT_FORMAT}')
+
 # TMDB API Configuration
 API_KEY = os.environ.get('TMDB_API_KEY', "728c7b4f5730549db84b7cafe2e0d30c")
 BASE_URL = "<https://api.themoviedb.org/3>"
@@ -29,22 +94,399 @@ MAX_PAGES = int(os.environ.get('MAX_PAGES', 5))
 MAX_DETAILS = int(os.environ.get('MAX_DETAILS', 50))
 MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 5))  # For parallel processing
 
-def make_api_request(url, retries=3, backoff_factor=0.5):
-    """Makes an API request with retry logic"""
+# Extraction configuration
+EXTRACTION_MODE = os.environ.get('EXTRACTION_MODE', 'sequential')  # 'sequential' or 'async'
+EXTRACTION_CONCURRENCY = int(os.environ.get('EXTRACTION_CONCURRENCY', 10))  # Pages in flight at once
+
+# Pipeline configuration
+PIPELINE_MODE = os.environ.get('PIPELINE_MODE', 'batch')  # 'batch', 'streaming', 'bootstrap' or 'fanout'
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 100))  # Movie IDs buffered between listing and enrichment
+
+_END_OF_STREAM = object()  # Queue sentinel telling detail workers the listing is finished
+
+# Incremental extraction: only new or changed movies get detail fetches (batch pipeline only)
+INCREMENTAL_MODE = os.environ.get('INCREMENTAL_MODE', 'false').lower() == 'true'
+CHANGES_MAX_DAYS = 14  # Longest window TMDB's /movie/changes accepts
+INCREMENTAL_SNAPSHOT_KEY = "incremental/snapshot"
+
+# Bootstrap from TMDB's daily ID export (PIPELINE_MODE=bootstrap)
+BOOTSTRAP_EXPORT_URL = "http://files.tmdb.org/p/exports/movie_ids_{date:%m_%d_%Y}.json.gz"
+BOOTSTRAP_SOURCE = os.environ.get('BOOTSTRAP_SOURCE', '')  # Export URL or local .json.gz path; empty for yesterday's export
+BOOTSTRAP_BATCH_SIZE = int(os.environ.get('BOOTSTRAP_BATCH_SIZE', 500))  # IDs enriched per batch
+BOOTSTRAP_PROGRESS_KEY = "bootstrap/progress"
+
+# Pipeline state (incremental snapshots and other run-to-run bookkeeping)
+STATE_STORE = os.environ.get('STATE_STORE', 's3')  # 'local', 'sqlite' or 's3'
+STATE_LOCATION = os.environ.get('STATE_LOCATION', '')  # Directory, SQLite file or S3 prefix; empty for the default
+
+# Fan-out enrichment (PIPELINE_MODE=fanout): shards exchange IDs and details through the state store
+FANOUT_SHARDS = int(os.environ.get('FANOUT_SHARDS', 4))
+FANOUT_EXECUTOR = os.environ.get('FANOUT_EXECUTOR', 'lambda')  # 'lambda' invokes this function per shard; 'process' uses a local process pool
+
+# Checkpointing: stop before the Lambda deadline, save progress and return a continuation token
+CHECKPOINTING = os.environ.get('CHECKPOINTING', 'false').lower() == 'true'  # Off: the batch pipeline runs to completion
+CHECKPOINT_SAFETY_MS = int(os.environ.get('CHECKPOINT_SAFETY_MS', 90000))  # Time kept back for transform, upload and checkpoint
+CHECKPOINT_AUTO_RESUME = os.environ.get('CHECKPOINT_AUTO_RESUME', 'true').lower() == 'true'  # Re-invoke asynchronously with the token
+CHECKPOINT_CHUNK_SIZE = int(os.environ.get('CHECKPOINT_CHUNK_SIZE', 50))  # Detail fetches between deadline checks
+
+# Adaptive concurrency for detail enrichment (starts at MAX_WORKERS)
+ADAPTIVE_CONCURRENCY = os.environ.get('ADAPTIVE_CONCURRENCY', 'false').lower() == 'true'
+MIN_CONCURRENCY = int(os.environ.get('MIN_CONCURRENCY', 1))
+MAX_CONCURRENCY = int(os.environ.get('MAX_CONCURRENCY', 20))
+
+# Rate limiting shared by every TMDB request (pages and details)
+TMDB_RATE_LIMIT = float(os.environ.get('TMDB_RATE_LIMIT', 40))  # Sustained requests per second; 0 disables limiting
+TMDB_RATE_BURST = int(os.environ.get('TMDB_RATE_BURST', 20))  # Requests allowed back-to-back after an idle period
+
+# Retry configuration, shared by every worker in a run
+RETRY_BUDGET = int(os.environ.get('RETRY_BUDGET', 100))  # Max retries across the whole run
+RETRY_BACKOFF_BUDGET = float(os.environ.get('RETRY_BACKOFF_BUDGET', 120))  # Max seconds all workers together may spend backing off
+RETRY_MAX_BACKOFF = float(os.environ.get('RETRY_MAX_BACKOFF', 10))  # Cap on one jittered backoff sleep
+
+# Movie details cache
+DETAILS_CACHE = os.environ.get('DETAILS_CACHE', 'none')  # 'none', 'local', 'sqlite' or 's3'
+DETAILS_CACHE_LOCATION = os.environ.get('DETAILS_CACHE_LOCATION', '')  # Directory, SQLite file or S3 prefix; empty for the default
+DETAILS_CACHE_TTL = int(os.environ.get('DETAILS_CACHE_TTL', 7 * 24 * 3600))  # Seconds before a cached entry is revalidated
+
+# HTTP configuration
+HTTP_TRANSPORT = os.environ.get('HTTP_TRANSPORT', 'pooled')  # 'pooled' (keep-alive) or 'urllib'
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 10))  # Socket timeout per request, in seconds
+
+class TransportMetrics:
+    """Counts requests, new connections and per-request latency for an HTTP transport"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections_opened = 0
+            self.latencies = []
+
+    def record(self, latency, new_connection):
+        with self._lock:
+            self.requests += 1
+            self.connections_opened += int(new_connection)
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            requests = self.requests
+            connections_opened = self.connections_opened
+
+        def percentile(q):
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1) if latencies else 0
+
+        return {
+            "requests": requests,
+            "connections_opened": connections_opened,
+            "connection_reuse_ratio": round(1 - connections_opened / requests, 3) if requests else 0,
+            "latency_ms_avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0,
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": round(latencies[-1] * 1000, 1) if latencies else 0
+        }
+
+class UrllibTransport:
+    """Opens a new connection for every request with urllib.request.urlopen"""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.metrics = TransportMetrics()
+
+    def get(self, url, headers=None):
+        """Returns (status, headers, body) for a GET request; raises HTTPError on 4xx/5xx"""
+        request = urllib.request.Request(url, headers=headers or {})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            if e.code != 304:  # A conditional request's "Not Modified" is a response, not an error
+                raise
+            return e.code, e.headers, b''
+        finally:
+            self.metrics.record(time.perf_counter() - start, new_connection=True)
+
+# Errors meaning a reused keep-alive socket was already closed by the server, before any of the response arrived
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+class PooledHTTPTransport:
+    """Keep-alive transport that reuses up to pool_size idle connections per host"""
+
+    def __init__(self, pool_size=5, timeout=10):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.metrics = TransportMetrics()
+        self._idle = {}  # (scheme, host, port) -> idle connections
+        self._lock = threading.Lock()
+        # A forked child (e.g. a fan-out process shard) must not share the parent's sockets
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self):
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme, host, port):
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=self.timeout)
+
+    def _checkout(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(*key), False
+
+    def _checkin(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                return
+        connection.close()
+
+    @staticmethod
+    def _send(connection, path, headers):
+        """Sends a GET and reads the response's status line and headers"""
+        connection.request("GET", path, headers=headers)
+        return connection.getresponse()
+
+    def get(self, url, headers=None):
+        """Returns (status, headers, body) for a GET request; raises HTTPError on 4xx/5xx"""
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        request_headers = {"Accept": "application/json", **(headers or {})}
+
+        connection, reused = self._checkout(key)
+        start = time.perf_counter()
+        try:
+            response = self._send(connection, path, request_headers)
+        except STALE_CONNECTION_ERRORS as e:
+            connection.close()
+            if not reused:
+                raise urllib.error.URLError(e)
+            # The server dropped an idle keep-alive connection before answering; retry once on a
+            # fresh one, spending a token like any other request
+            rate_limiter.acquire()
+            connection, reused = self._connect(*key), False
+            start = time.perf_counter()
+            try:
+                response = self._send(connection, path, request_headers)
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                raise urllib.error.URLError(e)
+        except (http.client.HTTPException, OSError) as e:
+            # Timeouts and the like: the request may have reached the server, so it isn't repeated here
+            connection.close()
+            raise urllib.error.URLError(e)
+        try:
+            body = response.read()
+        except (http.client.HTTPException, OSError) as e:
+            connection.close()
+            raise urllib.error.URLError(e)
+        self.metrics.record(time.perf_counter() - start, new_connection=not reused)
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(key, connection)
+
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+        return response.status, response.headers, body
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+def create_http_transport(name=HTTP_TRANSPORT):
+    """Builds the named HTTP transport"""
+    if name == 'urllib':
+        return UrllibTransport(timeout=HTTP_TIMEOUT)
+    if name == 'pooled':
+        # Size the pool for every thread that can be in flight, so no connection is dropped on checkin
+        return PooledHTTPTransport(pool_size=max(MAX_WORKERS, EXTRACTION_CONCURRENCY), timeout=HTTP_TIMEOUT)
+    raise ValueError(f"Unknown HTTP transport: {name}")
+
+# Created at import time so warm Lambda invocations reuse the open connections
+http_transport = create_http_transport()
+
+def set_http_transport(transport):
+    """Replaces the transport shared by every TMDB request"""
+    global http_transport
+    http_transport = transport
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter, usable from threads and asyncio"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.wait_seconds = 0.0
+
+    def _reserve(self):
+        """Takes a token and returns how long the caller must wait before using it"""
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens may go negative: each caller reserves its slot, so waiters are served in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+            self.wait_seconds += wait
+            return wait
+
+    def acquire(self):
+        """Blocks the calling thread until a request may be sent"""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Holds back every caller for at least the given number of seconds"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a request may be sent"""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def reset_metrics(self):
+        with self._lock:
+            self.wait_seconds = 0.0
+
+    def snapshot(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "wait_seconds": round(self.wait_seconds, 3)
+        }
+
+rate_limiter = TokenBucket(TMDB_RATE_LIMIT, TMDB_RATE_BURST)
+
+class RetryBudget:
+    """Run-wide cap on retries and time spent in backoff, shared by all workers"""
+
+    def __init__(self, max_retries, max_backoff_seconds):
+        self.max_retries = max_retries
+        self.max_backoff_seconds = max_backoff_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.retries = 0
+            self.backoff_seconds = 0.0
+            self.retries_refused = 0
+
+    def try_spend(self, sleep_time):
+        """Reserves one retry that sleeps sleep_time seconds; False if the budget can't cover it"""
+        with self._lock:
+            if self.retries >= self.max_retries or self.backoff_seconds + sleep_time > self.max_backoff_seconds:
+                self.retries_refused += 1
+                return False
+            self.retries += 1
+            self.backoff_seconds += sleep_time
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "retries_refused": self.retries_refused,
+                "max_retries": self.max_retries,
+                "max_backoff_seconds": self.max_backoff_seconds
+            }
+
+retry_budget = RetryBudget(RETRY_BUDGET, RETRY_BACKOFF_BUDGET)
+
+def retry_after_seconds(headers):
+    """Parses a Retry-After header (delay in seconds or HTTP date); None if absent or invalid"""
+    value = headers.get('Retry-After') if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def make_api_request(url, retries=3, backoff_factor=0.5, token_acquired=False, on_response=None,
+                     headers=None, include_response=False):
+    """Makes an API request with retry logic
+
+    on_response, if given, is called as on_response(status, latency) after every
+    attempt; status is None when no HTTP response was received. With
+    include_response, returns (status, headers, data) instead of just the data,
+    where data is None for a 304 Not Modified.
+    """
+    previous_sleep = backoff_factor
     for attempt in range(retries):
+        # Every attempt, retries included, spends a token; async callers take the first one themselves
+        if attempt > 0 or not token_acquired:
+            rate_limiter.acquire()
+        start = time.perf_counter()
         try:
-            with urllib.request.urlopen(url) as response:
-                return json.loads(response.read().decode('utf-8'))
+            status, response_headers, body = http_transport.get(url, headers=headers)
+            if on_response:
+                on_response(status, time.perf_counter() - start)
+            data = json.loads(body.decode('utf-8')) if body else None
+            return (status, response_headers, data) if include_response else data
         except urllib.error.HTTPError as e:
+            if on_response:
+                on_response(e.code, time.perf_counter() - start)
             if e.code in [429, 500, 502, 503, 504]:
-                sleep_time = backoff_factor * (2 ** attempt)
-                logger.warning(f"Request failed with status {e.code}. Retrying in {sleep_time} seconds...")
+                if attempt == retries - 1:
+                    break
+
+                retry_after = retry_after_seconds(e.headers)
+                if retry_after is not None:
+                    # Honor the server's delay, plus jitter so workers don't all come back at once
+                    sleep_time = retry_after + random.uniform(0, backoff_factor)
+                    if e.code == 429:
+                        rate_limiter.pause(retry_after)
+                else:
+                    # Decorrelated jitter: spreads out workers that failed at the same moment
+                    sleep_time = min(RETRY_MAX_BACKOFF, random.uniform(backoff_factor, previous_sleep * 3))
+                previous_sleep = sleep_time
+
+                if not retry_budget.try_spend(sleep_time):
+                    logger.error(f"Retry budget exhausted; not retrying status {e.code}")
+                    raise
+
+                logger.warning(f"Request failed with status {e.code}. Retrying in {sleep_time:.2f} seconds...")
                 time.sleep(sleep_time)
                 continue
             else:
                 logger.error(f"HTTP Error: {e.code} - {e.reason}")
                 raise
         except urllib.error.URLError as e:
+            if on_response:
+                on_response(None, time.perf_counter() - start)
             logger.error(f"URL Error: {e.reason}")
             raise
         except Exception as e:
@@ -54,144 +496,1432 @@ def make_api_request(url, retries=3, backoff_factor=0.5):
     # If we get here, all retries have failed
     raise Exception(f"Failed to fetch data from {url} after {retries} attempts")
 
-def fetch_movies(max_pages=5):
-    """Extracts movie data from TMDB API"""
-    movies_list = []
-    movie_ids_seen = set()  # Track movie IDs to prevent duplicates from API
+def parse_movie(movie):
+    """Converts a raw /movie/popular result into a movie record"""
+    return {
+        "movie_id": movie["id"],
+        "title": movie["title"],
+        "release_date": movie.get("release_date", ""),
+        "vote_average": movie.get("vote_average", None),
+        "vote_count": movie.get("vote_count", None),
+        "popularity": movie.get("popularity", None),
+        "overview": movie.get("overview", "No overview available"),
+        "poster_url": f"<https://image.tmdb.org/t/p/w500{movie['poster_path']}>" if movie.get("poster_path") else None
+    }
+
+def iter_movie_pages(max_pages=5, start_page=1, movie_ids_seen=None):
+    """Yields the unique movies of each /movie/popular page as soon as the page is fetched
 
-    for page in range(1, max_pages + 1):
+    start_page and movie_ids_seen let a resumed run continue where it stopped.
+    """
+    movie_ids_seen = set(movie_ids_seen or ())  # Track movie IDs to prevent duplicates from API
+
+    for page in range(start_page, max_pages + 1):
         url = f"{BASE_URL}/movie/popular?api_key={API_KEY}&language=en-US&page={page}"
 
         try:
             data = make_api_request(url)
-            
+            page_movies = []
+
             for movie in data.get("results", []):
                 movie_id = movie["id"]
-                
+
                 # Skip if we've already seen this movie ID
                 if movie_id in movie_ids_seen:
                     logger.info(f"Skipping duplicate movie ID {movie_id} from API response")
                     continue
-                    
+
                 movie_ids_seen.add(movie_id)
-                
-                movie_element = {
-                    "movie_id": movie_id,
-                    "title": movie["title"],
-                    "release_date": movie.get("release_date", ""),
-                    "vote_average": movie.get("vote_average", None),
-                    "vote_count": movie.get("vote_count", None),
-                    "popularity": movie.get("popularity", None),
-                    "overview": movie.get("overview", "No overview available"),
-                    "poster_url": f"<https://image.tmdb.org/t/p/w500{movie['poster_path']}>" if movie.get("poster_path") else None
-                }
-                movies_list.append(movie_element)
+                page_movies.append(parse_movie(movie))
 
-            logger.info(f"Page {page} fetched successfully! Total unique movies: {len(movies_list)}")
+            logger.info(f"Page {page} fetched successfully! Total unique movies: {len(movie_ids_seen)}")
         except Exception as e:
             logger.error(f"Error fetching page {page}: {str(e)}")
             if page == 1:  # If we can't even get the first page, abort
                 raise
             break
 
-        time.sleep(0.5)  # API rate limit handling
+        yield page_movies
+
+def fetch_movies(max_pages=5):
+    """Extracts movie data from TMDB API"""
+    movies_list = []
+    for page_movies in iter_movie_pages(max_pages):
+        movies_list.extend(page_movies)
+
+    logger.info(f"Successfully fetched {len(movies_list)} unique movies.")
+    return movies_list
+
+def fetch_movies_async(max_pages=5, concurrency=10):
+    """Extracts movie data from TMDB API, fetching pages concurrently with asyncio"""
+    return asyncio.run(_fetch_movies_async(max_pages, concurrency))
+
+async def _fetch_movies_async(max_pages, concurrency):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_page(page):
+        url = f"{BASE_URL}/movie/popular?api_key={API_KEY}&language=en-US&page={page}"
+        async with semaphore:
+            # Wait for a rate limit token on the event loop rather than parking a worker thread
+            await rate_limiter.acquire_async()
+            return await loop.run_in_executor(executor, partial(make_api_request, url, token_acquired=True))
+
+    # urllib is blocking, so requests run on a dedicated pool sized to the concurrency limit
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pages = await asyncio.gather(
+            *(fetch_page(page) for page in range(1, max_pages + 1)),
+            return_exceptions=True
+        )
+
+    # Process pages in order so dedup and output order match fetch_movies
+    movies_list = []
+    movie_ids_seen = set()
+    for page, data in enumerate(pages, start=1):
+        if isinstance(data, BaseException):
+            logger.error(f"Error fetching page {page}: {str(data)}")
+            if page == 1:  # If we can't even get the first page, abort
+                raise data
+            break
+
+        for movie in data.get("results", []):
+            movie_id = movie["id"]
+
+            if movie_id in movie_ids_seen:
+                logger.info(f"Skipping duplicate movie ID {movie_id} from API response")
+                continue
+
+            movie_ids_seen.add(movie_id)
+            movies_list.append(parse_movie(movie))
+
+        logger.info(f"Page {page} fetched successfully! Total unique movies: {len(movies_list)}")
 
     logger.info(f"Successfully fetched {len(movies_list)} unique movies.")
     return movies_list
 
-def fetch_movie_details(movie_id):
+class LocalDirectoryStore:
+    """Key/value store keeping one JSON file per key under a local directory"""
+
+    def __init__(self, root):
+        self.root = root
+        self.location = root
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a half-written document
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(temp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class SQLiteStore:
+    """Key/value store keeping JSON documents in a single SQLite table"""
+
+    def __init__(self, path):
+        self.location = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM documents WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO documents (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+            self._connection.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._connection.execute("DELETE FROM documents WHERE key = ?", (key,))
+            self._connection.commit()
+
+class S3Store:
+    """Key/value store keeping one JSON object per key under an S3 prefix"""
+
+    def __init__(self, bucket, prefix):
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        self.location = f"s3://{bucket}/{self.prefix}"
+        self._s3 = boto3.client("s3")
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}.json"
+
+    def get(self, key):
+        try:
+            response = self._s3.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self._s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response["Body"].read().decode('utf-8'))
+
+    def put(self, key, value):
+        self._s3.put_object(
+            Bucket=self.bucket, Key=self._key(key), Body=json.dumps(value).encode('utf-8'),
+            ContentType="application/json"
+        )
+
+    def delete(self, key):
+        self._s3.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+def create_store(backend, location, default_name):
+    """Builds a 'local', 'sqlite' or 's3' key/value store; location falls back to a default under default_name"""
+    if backend == 'local':
+        return LocalDirectoryStore(location or f"/tmp/{default_name}")
+    if backend == 'sqlite':
+        return SQLiteStore(location or f"/tmp/{default_name}.sqlite3")
+    if backend == 's3':
+        return S3Store(S3_BUCKET_NAME, location or default_name)
+    raise ValueError(f"Unknown store backend: {backend}")
+
+class DetailsCache:
+    """Caches flattened movie details by movie_id, with TTL expiry and ETag revalidation"""
+
+    def __init__(self, store, ttl_seconds):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.hits = 0  # Fresh entries served without a request
+            self.revalidated = 0  # Stale entries confirmed unchanged by a 304
+            self.misses = 0  # Entries fetched in full
+            self.stale_served = 0  # Stale entries served because the request failed
+
+    def count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def get(self, movie_id):
+        """Returns the cached entry ({details, etag, fetched_at}) or None"""
+        return self.store.get(f"details/{movie_id}")
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def put(self, movie_id, details, etag):
+        self.store.put(f"details/{movie_id}", {"details": details, "etag": etag, "fetched_at": time.time()})
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses + self.stale_served
+            return {
+                "backend": self.store.location,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "stale_served": self.stale_served,
+                "hit_rate": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0
+            }
+
+def create_details_cache():
+    """Builds the details cache configured by DETAILS_CACHE, or None when caching is off"""
+    if DETAILS_CACHE == 'none':
+        return None
+    return DetailsCache(create_store(DETAILS_CACHE, DETAILS_CACHE_LOCATION, "tmdb_details_cache"), DETAILS_CACHE_TTL)
+
+# Created at import time so warm Lambda invocations keep the SQLite connection and S3 client
+details_cache = create_details_cache()
+state_store = create_store(STATE_STORE, STATE_LOCATION, "pipeline_state")
+
+def fetch_movie_details(movie_id, on_response=None):
     """Fetches enriched movie details from TMDB API for a specific movie"""
     url = f"{BASE_URL}/movie/{movie_id}?api_key={API_KEY}&language=en-US&append_to_response=keywords"
 
+    cached = None
+    if details_cache:
+        cached = details_cache.get(movie_id)
+        if cached and details_cache.is_fresh(cached):
+            details_cache.count('hits')
+            return cached["details"]
+
     try:
-        movie = make_api_request(url)
-        
-        return {
-            'movie_id': movie_id,  # Include movie_id for joining later
-            'budget': movie.get('budget', None),
-            'revenue': movie.get('revenue', None),
-            'runtime': movie.get('runtime', None),
-            'status': movie.get('status', ''),
-            'tagline': movie.get('tagline', ''),
-            'genres': ', '.join([g['name'] for g in movie.get('genres', [])]),
-            'production_companies': ', '.join([c['name'] for c in movie.get('production_companies', [])]),
-            'spoken_languages': ', '.join([l['name'] for l in movie.get('spoken_languages', [])]),
-            'original_language': movie.get('original_language', ''),
-            'adult': str(movie.get('adult', False)),
-            'homepage': movie.get('homepage', ''),
-            'imdb_id': movie.get('imdb_id', ''),
-            'keywords': ', '.join([k['name'] for k in movie.get('keywords', {}).get('keywords', [])])
-        }
+        # Ask TMDB to skip the body if our cached copy is still current
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else None
+        status, response_headers, movie = make_api_request(
+            url, on_response=on_response, headers=headers, include_response=True
+        )
+
+        if status == 304:
+            details_cache.count('revalidated')
+            _cache_details(movie_id, cached["details"], cached["etag"])
+            return cached["details"]
+
+        details = parse_movie_details(movie_id, movie)
+        if details_cache:
+            details_cache.count('misses')
+            _cache_details(movie_id, details, response_headers.get("ETag"))
+        return details
     except Exception as e:
         logger.error(f"Failed to fetch details for movie {movie_id}: {str(e)}")
+        if cached:
+            details_cache.count('stale_served')
+            return cached["details"]
         return {'movie_id': movie_id}  # Return at least the ID so we can join later
 
-def enrich_movie_data_parallel(movies_list, max_details=None, max_workers=5):
-    """Enriches movie data using parallel processing"""
-    # Ensure we have no duplicates in the input list
+def _cache_details(movie_id, details, etag):
+    """Writes details to the cache; a failed write is logged, since the details themselves are good"""
+    try:
+        details_cache.put(movie_id, details, etag)
+    except Exception as e:
+        logger.warning(f"Failed to cache details for movie {movie_id}: {str(e)}")
+
+def parse_movie_details(movie_id, movie):
+    """Flattens a raw /movie/{id} response into the detail fields we keep
+
+    The listing fields (title, release_date, votes, ...) are included too, so
+    movies that didn't come from /movie/popular (e.g. bootstrap) are complete.
+    """
+    return {
+        **parse_movie(movie),
+        'movie_id': movie_id,  # Include movie_id for joining later
+        'budget': movie.get('budget', None),
+        'revenue': movie.get('revenue', None),
+        'runtime': movie.get('runtime', None),
+        'status': movie.get('status', ''),
+        'tagline': movie.get('tagline', ''),
+        'genres': ', '.join([g['name'] for g in movie.get('genres', [])]),
+        'production_companies': ', '.join([c['name'] for c in movie.get('production_companies', [])]),
+        'spoken_languages': ', '.join([l['name'] for l in movie.get('spoken_languages', [])]),
+        'original_language': movie.get('original_language', ''),
+        'adult': str(movie.get('adult', False)),
+        'homepage': movie.get('homepage', ''),
+        'imdb_id': movie.get('imdb_id', ''),
+        'keywords': ', '.join([k['name'] for k in movie.get('keywords', {}).get('keywords', [])]),
+        **({'_tmdb_entities': tmdb_entities(movie)} if BRIDGE_TABLES else {})
+    }
+
+def tmdb_entities(movie):
+    """[id, name] pairs of a raw /movie/{id} response's genres, keywords and production companies
+
+    Carried alongside the joined strings so the bridge tables can use TMDB's ids;
+    the handler drops them before the fact table is written.
+    """
+    return {
+        'genres': [[g['id'], g['name']] for g in movie.get('genres', [])],
+        'keywords': [[k['id'], k['name']] for k in movie.get('keywords', {}).get('keywords', [])],
+        'production_companies': [[c['id'], c['name']] for c in movie.get('production_companies', [])]
+    }
+
+class AIMDConcurrencyController:
+    """Adapts the number of in-flight detail requests with additive increase / multiplicative decrease
+
+    The limit grows by one each time a full limit's worth of requests succeeds
+    with healthy latency. It is cut by decrease_factor on a 429, a 5xx, a
+    connection error, or a p95 latency above latency_tolerance times the best
+    p95 seen so far. Use the controller as a context manager around each request
+    to hold one in-flight slot, and pass record() as the on_response callback.
+    """
+
+    def __init__(self, initial=5, min_limit=1, max_limit=20, latency_window=20,
+                 latency_tolerance=2.0, decrease_factor=0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_window = latency_window
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._latencies = []
+        self._baseline_p95 = None
+        self._responses_since_decrease = 0
+        self._condition = threading.Condition()
+        self.increases = 0
+        self.decreases = 0
+        self.limit_low = int(self.limit)
+        self.limit_high = int(self.limit)
+
+    def __enter__(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def record(self, status, latency):
+        """Feeds one response into the controller"""
+        with self._condition:
+            self._responses_since_decrease += 1
+            if status is None or status == 429 or status >= 500:
+                self._decrease(f"status {status}")
+                return
+
+            self._latencies.append(latency)
+            if len(self._latencies) >= self.latency_window:
+                latencies = sorted(self._latencies)
+                self._latencies = []
+                p95 = latencies[int(0.95 * (len(latencies) - 1))]
+                if self._baseline_p95 is None or p95 < self._baseline_p95:
+                    self._baseline_p95 = p95
+                elif p95 > self._baseline_p95 * self.latency_tolerance:
+                    self._decrease(f"p95 latency {p95 * 1000:.0f}ms")
+                    return
+
+            if self.limit < self.max_limit:
+                previous = int(self.limit)
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                if int(self.limit) > previous:
+                    self.increases += 1
+                    self.limit_high = max(self.limit_high, int(self.limit))
+                    self._condition.notify_all()
+
+    def _decrease(self, reason):
+        # Responses to requests sent before the last cut reflect the old limit; ignore them
+        if self._responses_since_decrease < int(self.limit) and self.decreases:
+            return
+        self._responses_since_decrease = 0
+        self._latencies = []
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.decreases += 1
+        self.limit_low = min(self.limit_low, int(self.limit))
+        logger.warning(f"Backing off detail concurrency to {int(self.limit)} ({reason})")
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "adaptive": True,
+                "limit": int(self.limit),
+                "limit_low": self.limit_low,
+                "limit_high": self.limit_high,
+                "increases": self.increases,
+                "decreases": self.decreases
+            }
+
+def _fetch_details_with(concurrency_controller):
+    """Returns a detail fetcher that holds a controller slot for the whole request"""
+    if concurrency_controller is None:
+        return fetch_movie_details
+
+    def fetch(movie_id):
+        with concurrency_controller:
+            return fetch_movie_details(movie_id, on_response=concurrency_controller.record)
+
+    return fetch
+
+def select_movies_to_process(movies_list, max_details=None):
+    """Drops duplicate movie IDs and applies the max_details cap"""
     unique_movie_ids = {}
     unique_movies = []
-    
+
     for movie in movies_list:
         movie_id = movie["movie_id"]
         if movie_id not in unique_movie_ids:
             unique_movie_ids[movie_id] = True
             unique_movies.append(movie)
-    
+
     if len(unique_movies) < len(movies_list):
         logger.info(f"Removed {len(movies_list) - len(unique_movies)} duplicate movies before enrichment")
-    
-    movies_to_process = unique_movies[:max_details] if max_details else unique_movies
+
+    return unique_movies[:max_details] if max_details else unique_movies
+
+def fetch_details_parallel(movie_ids, max_workers=5, concurrency_controller=None):
+    """Fetches details for movie_ids in parallel and returns them keyed by movie_id
+
+    With a concurrency_controller, the pool is sized to the controller's
+    max_limit and the controller decides how many requests are in flight.
+    """
+    # Use ThreadPoolExecutor for parallel API calls
+    details_list = []
+    if concurrency_controller:
+        max_workers = concurrency_controller.max_limit
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        details_list = list(executor.map(_fetch_details_with(concurrency_controller), movie_ids))
+
+    # Create a dict for quick lookup of details by movie_id
+    return {detail['movie_id']: detail for detail in details_list if detail}
+
+def enrich_movie_data_parallel(movies_list, max_details=None, max_workers=5, concurrency_controller=None):
+    """Enriches movie data using parallel processing"""
+    # Ensure we have no duplicates in the input list
+    movies_to_process = select_movies_to_process(movies_list, max_details)
     movie_ids = [movie["movie_id"] for movie in movies_to_process]
 
-    # Use ThreadPoolExecutor for parallel API calls
-    details_list = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        details_list = list(executor.map(fetch_movie_details, movie_ids))
+    details_dict = fetch_details_parallel(movie_ids, max_workers, concurrency_controller)
+
+    return merge_movie_details(movies_to_process, details_dict)
+
+def iter_export_movies(source, start_offset=0):
+    """Streams (offset, movie) pairs from a gzipped TMDB daily ID export
+
+    source is a URL or a local path. The file is decompressed line by line, so
+    memory stays flat whatever its size. Lines before start_offset are skipped,
+    and adult titles are skipped like they are on /movie/popular.
+    """
+    if source.startswith(("http://", "https://")):
+        raw = urllib.request.urlopen(source, timeout=HTTP_TIMEOUT)
+    else:
+        raw = open(source, 'rb')
+
+    with raw, gzip.open(raw, 'rt', encoding='utf-8') as lines:
+        for offset, line in enumerate(lines):
+            if offset < start_offset or not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("adult"):
+                continue
+            yield offset, {"movie_id": entry["id"]}
+
+def bootstrap_movies(source, start_offset=0, limit=None, batch_size=500, max_workers=5, concurrency_controller=None):
+    """Enriches the movies listed in a TMDB daily ID export, batch_size IDs at a time
+
+    Yields (next_offset, enriched_movies) after each batch; next_offset is
+    where a later run should resume. Stops after limit movies if given.
+    """
+    batch = []
+    processed = 0
+    next_offset = start_offset
+    for offset, movie in iter_export_movies(source, start_offset):
+        batch.append(movie)
+        next_offset = offset + 1
+        if len(batch) == batch_size or (limit and processed + len(batch) >= limit):
+            yield next_offset, enrich_movie_data_parallel(
+                batch, max_workers=max_workers, concurrency_controller=concurrency_controller
+            )
+            processed += len(batch)
+            batch = []
+            if limit and processed >= limit:
+                return
+
+    if batch:
+        yield next_offset, enrich_movie_data_parallel(
+            batch, max_workers=max_workers, concurrency_controller=concurrency_controller
+        )
+
+def run_fanout_shard(shard_event):
+    """Worker side of fan-out: enriches one shard's IDs and writes the details to the exchange store"""
+    run_id, shard = shard_event["run_id"], shard_event["shard"]
+    global rate_limiter
+    # Every shard draws from the same TMDB quota, so each one gets its share of the rate limit;
+    # the full limiter comes back afterwards, or later runs in this warm container would keep the share
+    shared_rate_limiter = rate_limiter
+    rate_limiter = TokenBucket(shard_event["rate_limit"], shard_event["rate_burst"])
+    try:
+        movie_ids = state_store.get(f"fanout/{run_id}/input-{shard}")["movie_ids"]
+        details = fetch_details_parallel(movie_ids, max_workers=shard_event["max_workers"])
+    finally:
+        rate_limiter = shared_rate_limiter
+    state_store.put(f"fanout/{run_id}/output-{shard}", {
+        "details": {str(movie_id): detail for movie_id, detail in details.items()}
+    })
+
+    failed = sum(1 for detail in details.values() if len(detail) == 1)
+    logger.info(f"Fan-out shard {shard} of run {run_id} enriched {len(movie_ids)} movies ({failed} failed)")
+    return {"run_id": run_id, "shard": shard, "movies": len(movie_ids), "failed": failed}
+
+def _invoke_fanout_shard_lambda(function_name):
+    """Returns a shard runner that invokes this Lambda synchronously with the shard event"""
+    # Shards can run for minutes, far beyond botocore's default 60s read timeout
+    lambda_client = boto3.client("lambda", config=Config(read_timeout=900, retries={"max_attempts": 0}))
+
+    def invoke(shard_event):
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps({"fanout_shard": shard_event}).encode("utf-8")
+        )
+        payload = json.loads(response["Payload"].read())
+        if response.get("FunctionError"):
+            raise Exception(f"Shard {shard_event['shard']} failed: {payload.get('errorMessage', payload)}")
+        return payload
+
+    return invoke
+
+def enrich_movies_fanout(movies_list, context=None, shards=4, executor="lambda", max_details=None, max_workers=5):
+    """Splits enrichment into shards that run in separate Lambda invocations (or local processes)
+
+    The coordinator writes each shard's IDs to the state store, runs the shards
+    in parallel, then merges their details back in listing order. If any shard
+    fails the run fails with it, rather than publishing that shard's movies
+    without their details. Returns (enriched_movies, stats).
+    """
+    movies_to_process = select_movies_to_process(movies_list, max_details)
+    movie_ids = [movie["movie_id"] for movie in movies_to_process]
+    shards = max(1, min(shards, len(movie_ids)))
+    run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+    shard_events = []
+    shard_size = -(-len(movie_ids) // shards)  # Ceiling division so no shard is left over
+    for shard in range(shards):
+        state_store.put(f"fanout/{run_id}/input-{shard}", {
+            "movie_ids": movie_ids[shard * shard_size:(shard + 1) * shard_size]
+        })
+        shard_events.append({
+            "run_id": run_id,
+            "shard": shard,
+            "max_workers": max_workers,
+            "rate_limit": TMDB_RATE_LIMIT / shards,
+            "rate_burst": max(1, TMDB_RATE_BURST // shards)
+        })
+
+    logger.info(f"Fanning out {len(movie_ids)} movies to {shards} {executor} shards (run {run_id})")
+    if executor == "lambda":
+        pool = ThreadPoolExecutor(max_workers=shards)
+        run_shard = _invoke_fanout_shard_lambda(context.function_name)
+    elif executor == "process":
+        pool = ProcessPoolExecutor(max_workers=shards)
+        run_shard = run_fanout_shard
+    else:
+        raise ValueError(f"Unknown fan-out executor: {executor}")
+
+    with pool:
+        futures = [pool.submit(run_shard, shard_event) for shard_event in shard_events]
+
+    # Merge step: join every shard's output back onto the listing
+    details_dict = {}
+    failed_shards = []
+    for shard, future in enumerate(futures):
+        try:
+            future.result()
+            output = state_store.get(f"fanout/{run_id}/output-{shard}")
+            details_dict.update({int(movie_id): detail for movie_id, detail in output["details"].items()})
+        except Exception as e:
+            logger.error(f"Fan-out shard {shard} failed: {str(e)}")
+            failed_shards.append(shard)
+        for name in ("input", "output"):
+            state_store.delete(f"fanout/{run_id}/{name}-{shard}")
+
+    if failed_shards:
+        raise Exception(f"Fan-out shard(s) {failed_shards} of run {run_id} failed; their movies have no details")
+    stats = {"run_id": run_id, "executor": executor, "shards": shards}
+    return merge_movie_details(movies_to_process, details_dict), stats
+
+def checkpoint_safety_ms(context):
+    """CHECKPOINT_SAFETY_MS, capped at a quarter of the time the invocation started with
+
+    Call it at the start of the invocation. Without the cap, a function whose
+    timeout is close to the margin would checkpoint before doing any work.
+    """
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return CHECKPOINT_SAFETY_MS
+    return min(CHECKPOINT_SAFETY_MS, context.get_remaining_time_in_millis() // 4)
+
+def remaining_time_is_short(context, safety_ms=CHECKPOINT_SAFETY_MS):
+    """True when the Lambda has less than safety_ms left; always False outside Lambda"""
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return False
+    return context.get_remaining_time_in_millis() < safety_ms
+
+def invoke_continuation(function_name, continuation_token):
+    """Re-invokes this Lambda asynchronously so it resumes from the checkpoint on its own"""
+    boto3.client("lambda").invoke(
+        FunctionName=function_name,
+        InvocationType="Event",
+        Payload=json.dumps({"continuation_token": continuation_token}).encode("utf-8")
+    )
+
+def extract_and_enrich_resumable(context, checkpoint=None, max_pages=5, max_details=None, max_workers=5,
+                                 concurrency_controller=None, chunk_size=50, safety_ms=CHECKPOINT_SAFETY_MS):
+    """Lists and enriches movies, stopping early with a checkpoint when Lambda time runs short
+
+    Returns (enriched_movies, None) once finished, or (None, checkpoint) when
+    out of time. Passing that checkpoint back in resumes from the last page
+    listed and the last detail chunk fetched. Without a Lambda context (e.g.
+    CHECKPOINTING off) details are fetched in one pool, not chunk_size chunks.
+    """
+    checkpoint = checkpoint or {"stage": "listing", "pages_fetched": 0, "movies_list": [], "details": {}}
+    movies_list = checkpoint["movies_list"]
+
+    if checkpoint["stage"] == "listing":
+        if EXTRACTION_MODE == 'async':
+            # Concurrent listing is quick, so it runs in one go without page checkpoints
+            movies_list.extend(fetch_movies_async(max_pages=max_pages, concurrency=EXTRACTION_CONCURRENCY))
+            checkpoint["pages_fetched"] = max_pages
+        else:
+            pages = iter_movie_pages(
+                max_pages,
+                start_page=checkpoint["pages_fetched"] + 1,
+                movie_ids_seen=(movie["movie_id"] for movie in movies_list)
+            )
+            for page_movies in pages:
+                movies_list.extend(page_movies)
+                checkpoint["pages_fetched"] += 1
+                if checkpoint["pages_fetched"] < max_pages and remaining_time_is_short(context, safety_ms):
+                    logger.warning(f"Running out of time after {checkpoint['pages_fetched']} pages; checkpointing")
+                    return None, checkpoint
+
+        if not movies_list:
+            raise Exception("Failed to fetch movies")
+        logger.info(f"Successfully fetched {len(movies_list)} unique movies.")
+        checkpoint["stage"] = "enrich"
+
+    movies_to_process = select_movies_to_process(movies_list, max_details)
+    details = checkpoint["details"]  # JSON keys, so str(movie_id) -> details
+    remaining_ids = [movie["movie_id"] for movie in movies_to_process if str(movie["movie_id"]) not in details]
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        # Nothing to checkpoint against, so chunk barriers would only cost throughput
+        chunk_size = max(1, len(remaining_ids))
+
+    for start in range(0, len(remaining_ids), chunk_size):
+        # Always make some progress, even if the invocation started with little time left
+        if start and remaining_time_is_short(context, safety_ms):
+            logger.warning(f"Running out of time with {len(remaining_ids) - start} movies left to enrich; checkpointing")
+            return None, checkpoint
+        fetched = fetch_details_parallel(remaining_ids[start:start + chunk_size], max_workers, concurrency_controller)
+        details.update({str(movie_id): detail for movie_id, detail in fetched.items()})
+
+    return merge_movie_details(movies_to_process, {int(movie_id): detail for movie_id, detail in details.items()}), None
+
+def fetch_changed_movie_ids(since, until):
+    """Returns the IDs TMDB reports as changed between two datetimes, or None if we can't tell"""
+    if until - since > timedelta(days=CHANGES_MAX_DAYS):
+        logger.warning(f"Last run was {until - since} ago, longer than /movie/changes covers; doing a full refresh")
+        return None
+
+    changed_ids = set()
+    page, total_pages = 1, 1
+    try:
+        while page <= total_pages:
+            url = (f"{BASE_URL}/movie/changes?api_key={API_KEY}"
+                   f"&start_date={since:%Y-%m-%d}&end_date={until:%Y-%m-%d}&page={page}")
+            data = make_api_request(url)
+            changed_ids.update(item["id"] for item in data.get("results", []))
+            total_pages = data.get("total_pages", 1)
+            page += 1
+    except Exception as e:
+        logger.error(f"Error fetching changed movie IDs (page {page}): {str(e)}; doing a full refresh")
+        return None
+
+    logger.info(f"TMDB reports {len(changed_ids)} movies changed since {since:%Y-%m-%d}")
+    return changed_ids
+
+def enrich_movies_incremental(movies_list, snapshot, run_started, max_details=None, max_workers=5,
+                              concurrency_controller=None):
+    """Fetches details only for new or changed movies, carrying the rest over from the previous snapshot
+
+    snapshot is the state saved by the previous run (or None for the first
+    run). Returns (enriched_movies, new_snapshot, stats); save new_snapshot only
+    once this run's output has been written. The new snapshot holds only this
+    run's movies, so one that drops out of the listing is fetched again if it returns.
+    """
+    movies_to_process = select_movies_to_process(movies_list, max_details)
+
+    previous_details = {}
+    changed_ids = None
+    if snapshot:
+        changed_ids = fetch_changed_movie_ids(datetime.fromisoformat(snapshot["last_run"]), run_started)
+        if changed_ids is not None:
+            # Details of changed movies are stale, whether or not they are popular today
+            previous_details = {
+                movie_id: details for movie_id, details in snapshot["details"].items()
+                if int(movie_id) not in changed_ids
+            }
+
+    details_dict = {}
+    movie_ids_to_fetch = []
+    for movie in movies_to_process:
+        movie_id = movie["movie_id"]
+        if str(movie_id) in previous_details:
+            details_dict[movie_id] = previous_details[str(movie_id)]
+        else:
+            movie_ids_to_fetch.append(movie_id)
+
+    carried_over = len(details_dict)
+    logger.info(f"Fetching details for {len(movie_ids_to_fetch)} new or changed movies; "
+                f"carrying over {carried_over} from the previous snapshot")
+    details_dict.update(fetch_details_parallel(movie_ids_to_fetch, max_workers, concurrency_controller))
+
+    # Only this run's movies are kept, so the snapshot stays the size of one listing rather than every movie
+    # ever fetched; failed fetches (only a movie_id) are left out so the next run retries them
+    new_details = {str(movie_id): details for movie_id, details in details_dict.items() if len(details) > 1}
+    new_snapshot = {"last_run": run_started.isoformat(), "details": new_details}
+
+    stats = {
+        "changed_ids": len(changed_ids) if changed_ids is not None else "full refresh",
+        "details_fetched": len(movie_ids_to_fetch),
+        "details_carried_over": carried_over
+    }
+    return merge_movie_details(movies_to_process, details_dict), new_snapshot, stats
+
+def merge_movie_details(movies_to_process, details_dict):
+    """Joins fetched details onto the listing records, keeping listing order"""
+    enriched_movies = []
+    for movie in movies_to_process:
+        movie_id = movie["movie_id"]
+        if movie_id in details_dict:
+            # Remove movie_id from details to avoid duplication
+            details = details_dict[movie_id].copy()
+            details.pop('movie_id', None)
+            # Merge the dictionaries; fields the listing already has (title, votes, ...) keep the listing's value
+            enriched_movie = {**details, **movie}
+            enriched_movies.append(enriched_movie)
+        else:
+            enriched_movies.append(movie)
+
+    return enriched_movies
+
+def stream_enrich_movies(max_pages=5, max_details=None, max_workers=5, queue_size=100, concurrency_controller=None):
+    """Overlaps page listing and detail enrichment by streaming movie IDs through a bounded queue"""
+    if concurrency_controller:
+        max_workers = concurrency_controller.max_limit
+    fetch_details = _fetch_details_with(concurrency_controller)
+    id_queue = queue.Queue(maxsize=queue_size)
+    movies_to_process = []
+    details_dict = {}
+    listing_errors = []
+
+    def list_movies():
+        try:
+            for page_movies in iter_movie_pages(max_pages):
+                for movie in page_movies:
+                    # Stop listing once we have every movie we are going to enrich
+                    if max_details and len(movies_to_process) >= max_details:
+                        return
+                    movies_to_process.append(movie)
+                    id_queue.put(movie["movie_id"])  # Blocks while the detail workers are behind
+        except Exception as e:
+            listing_errors.append(e)
+        finally:
+            for _ in range(max_workers):
+                id_queue.put(_END_OF_STREAM)
+
+    def enrich_movies():
+        while True:
+            movie_id = id_queue.get()
+            if movie_id is _END_OF_STREAM:
+                return
+            details_dict[movie_id] = fetch_details(movie_id)
+
+    with ThreadPoolExecutor(max_workers=max_workers + 1) as executor:
+        futures = [executor.submit(list_movies)]
+        futures += [executor.submit(enrich_movies) for _ in range(max_workers)]
+        for future in futures:
+            future.result()
+
+    if listing_errors:
+        raise listing_errors[0]
+
+    logger.info(f"Streamed {len(movies_to_process)} movies through enrichment.")
+    return merge_movie_details(movies_to_process, details_dict)
+
+class _MissingType:
+    """Type of _MISSING; pickles by name, so the sentinel is still _MISSING after a trip to a worker process"""
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_MISSING'
+
+    def __repr__(self):
+        return '<missing>'
+
+_MISSING = _MissingType()  # A key absent from a record, as opposed to present with None
+
+# Per-row value kinds of a NumericColumn, so ints and floats come back out exactly as they went in
+KIND_MISSING, KIND_NONE, KIND_INT, KIND_FLOAT = 0, 1, 2, 3
+# Ints past this could lose precision in a double after a subtraction, so such columns stay as objects
+EXACT_INT_LIMIT = 2 ** 52
+
+class NumericColumn:
+    """Numbers as doubles in an array('d'), with a bytearray of per-row kinds (missing, None, int or float)"""
+    __slots__ = ('values', 'kinds')
+    # Exact types a column can hold; bool and other subclasses go to ObjectColumn
+    VALUE_TYPES = {int, float, type(None), _MissingType}
+    _KIND_BY_TYPE = {_MissingType: KIND_MISSING, type(None): KIND_NONE, int: KIND_INT, float: KIND_FLOAT}
+
+    def __init__(self, values=None, kinds=None):
+        self.values = values if values is not None else array('d')
+        self.kinds = kinds if kinds is not None else bytearray()
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(array('d', [value if type(value) in (int, float) else 0.0 for value in values]),
+                   bytearray(map(cls._KIND_BY_TYPE.__getitem__, map(type, values))))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def append(self, value):
+        if value is _MISSING:
+            self.values.append(0.0)
+            self.kinds.append(KIND_MISSING)
+        elif value is None:
+            self.values.append(0.0)
+            self.kinds.append(KIND_NONE)
+        else:
+            self.values.append(value)
+            self.kinds.append(KIND_INT if isinstance(value, int) else KIND_FLOAT)
+
+    def decode(self, start=0, stop=None):
+        """Python values of rows start:stop, with _MISSING for absent keys"""
+        decoded = (None, _MISSING)
+        return [int(value) if kind == KIND_INT else value if kind == KIND_FLOAT else decoded[kind == KIND_MISSING]
+                for value, kind in zip(self.values[start:stop], self.kinds[start:stop])]
+
+    def present_values(self):
+        """Values of rows holding a number, as floats"""
+        return [value for value, kind in zip(self.values, self.kinds) if kind >= KIND_INT]
+
+    def fill(self, value):
+        """Replaces missing and None rows with value"""
+        kind = KIND_INT if isinstance(value, int) else KIND_FLOAT
+        for empty_kind in (KIND_MISSING, KIND_NONE):
+            index = self.kinds.find(empty_kind)
+            while index != -1:
+                self.values[index] = value
+                self.kinds[index] = kind
+                index = self.kinds.find(empty_kind, index + 1)
+
+    def has_values(self):
+        return any(self.kinds)
+
+    def take(self, indices):
+        return NumericColumn(array('d', [self.values[i] for i in indices]), bytearray(self.kinds[i] for i in indices))
+
+    def slice(self, start, stop):
+        return NumericColumn(self.values[start:stop], self.kinds[start:stop])
+
+    @classmethod
+    def concat(cls, columns):
+        joined = cls()
+        for column in columns:
+            joined.values.extend(column.values)
+            joined.kinds += column.kinds
+        return joined
+
+class StringColumn:
+    """Dictionary-encoded strings: array('i') codes into a list of distinct values
+
+    Codes 0 and 1 are reserved for a missing key and None, so repeated values
+    (genres, languages, status, ...) are stored once however many rows hold them.
+    """
+    __slots__ = ('codes', 'dictionary', '_index')
+    VALUE_TYPES = {str, type(None), _MissingType}
+
+    def __init__(self, codes=None, dictionary=None):
+        self.codes = codes if codes is not None else array('i')
+        self.dictionary = dictionary if dictionary is not None else [_MISSING, None]
+        self._index = {value: code for code, value in enumerate(self.dictionary) if code > 1}
+
+    @classmethod
+    def from_values(cls, values):
+        index = {_MISSING: 0, None: 1}
+        codes = array('i', [index.setdefault(value, len(index)) for value in values])
+        return cls(codes, list(index))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def encode(self, value):
+        if value is _MISSING:
+            return 0
+        if value is None:
+            return 1
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return code
+
+    def decode(self, start=0, stop=None):
+        return list(map(self.dictionary.__getitem__, self.codes[start:stop]))
+
+    def present_values(self):
+        return [float(self.dictionary[code]) for code in self.codes if code > 1]
+
+    def fill(self, value):
+        """Replaces missing rows with value"""
+        code = self.encode(value)
+        index = self.codes.index(0) if 0 in self.codes else -1
+        while index != -1:
+            self.codes[index] = code
+            try:
+                index = self.codes.index(0, index + 1)
+            except ValueError:
+                index = -1
+
+    def has_values(self):
+        return any(self.codes)
+
+    def take(self, indices):
+        return StringColumn(array('i', [self.codes[i] for i in indices]), list(self.dictionary))
+
+    def slice(self, start, stop):
+        """Rows start:stop, re-encoded so the dictionary holds only the values they use"""
+        return StringColumn.from_values(self.decode(start, stop))
+
+    @classmethod
+    def concat(cls, columns):
+        joined = cls()
+        for column in columns:
+            recode = [joined.encode(value) for value in column.dictionary]
+            joined.codes.extend(array('i', map(recode.__getitem__, column.codes)))
+        return joined
+
+    def __getstate__(self):
+        return self.codes, self.dictionary
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+class ObjectColumn:
+    """Any other values (bools, lists, large ints, mixed types), kept as a plain list"""
+    __slots__ = ('items',)
+
+    def __init__(self, items=None):
+        self.items = items if items is not None else []
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(values)
+
+    def __len__(self):
+        return len(self.items)
+
+    def decode(self, start=0, stop=None):
+        return self.items[start:stop]
+
+    def present_values(self):
+        return [float(item) for item in self.items if item is not _MISSING and item is not None]
+
+    def fill(self, value):
+        """Replaces missing rows with value"""
+        self.items = [value if item is _MISSING else item for item in self.items]
+
+    def has_values(self):
+        return any(item is not _MISSING for item in self.items)
+
+    def take(self, indices):
+        return ObjectColumn([self.items[i] for i in indices])
+
+    def slice(self, start, stop):
+        return ObjectColumn(self.items[start:stop])
+
+    @classmethod
+    def concat(cls, columns):
+        return cls([item for column in columns for item in column.items])
+
+class MovieBatch:
+    """Columnar batch of movie records, used from enrichment output through to the writers
+
+    Each field is one typed column rather than a key repeated in every row's
+    dict, so the transform works a column at a time. from_records() and
+    to_records() convert at the edges; a record missing a key round-trips as
+    missing, and ints/floats come back with their original type.
+    """
+
+    def __init__(self, columns=None, length=0):
+        self.columns = columns if columns is not None else {}
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    @classmethod
+    def from_records(cls, records):
+        names = dict.fromkeys(chain.from_iterable(records))
+        columns = {}
+        for name in names:
+            values = [record.get(name, _MISSING) for record in records]
+            value_types = set(map(type, values))
+            if value_types <= NumericColumn.VALUE_TYPES and (int not in value_types or all(
+                    -EXACT_INT_LIMIT <= value <= EXACT_INT_LIMIT for value in values if type(value) is int)):
+                # Fields that are None in every row are stored as strings; they dictionary-encode to one code
+                column_type = StringColumn if value_types <= {type(None), _MissingType} else NumericColumn
+            elif value_types <= StringColumn.VALUE_TYPES:
+                column_type = StringColumn
+            else:
+                column_type = ObjectColumn
+            columns[name] = column_type.from_values(values)
+        return cls(columns, len(records))
+
+    def to_records(self, start=0, stop=None):
+        """Rebuilds row dicts for rows start:stop, leaving out keys the original records didn't have"""
+        stop = self.length if stop is None else min(stop, self.length)
+        names = list(self.columns)
+        decoded = [column.decode(start, stop) for column in self.columns.values()]
+        records = [dict(zip(names, row)) for row in zip(*decoded)] if names else [{} for _ in range(start, stop)]
+        for name, values in zip(names, decoded):
+            if _MISSING in values:
+                for record, value in zip(records, values):
+                    if value is _MISSING:
+                        del record[name]
+        return records
+
+    def field_names(self):
+        """Fields present in at least one row, sorted by name, like the union of the records' keys"""
+        return sorted(name for name, column in self.columns.items() if column.has_values())
+
+    def take(self, indices):
+        """A new batch holding the given rows, in the given order"""
+        return MovieBatch({name: column.take(indices) for name, column in self.columns.items()}, len(indices))
+
+    def drop(self, name):
+        """A new batch sharing every column except name"""
+        return MovieBatch({key: column for key, column in self.columns.items() if key != name}, self.length)
+
+    def chunks(self, chunk_rows, names=None):
+        """Consecutive batches of at most chunk_rows rows, optionally with only the named columns"""
+        names = [name for name in (names or self.columns) if name in self.columns]
+        for start in range(0, self.length, chunk_rows):
+            stop = min(start + chunk_rows, self.length)
+            yield MovieBatch({name: self.columns[name].slice(start, stop) for name in names}, stop - start)
+
+    @classmethod
+    def concat(cls, batches):
+        """Joins batches with the same columns end to end"""
+        batches = list(batches)
+        if not batches:
+            return cls()
+        columns = {
+            name: type(column).concat([batch.columns[name] for batch in batches])
+            for name, column in batches[0].columns.items()
+        }
+        return cls(columns, sum(len(batch) for batch in batches))
+
+class TDigest:
+    """Mergeable t-digest (Dunning's merging variant): approximate quantiles in O(compression) memory"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.count = 0
+        self.centroids = []  # (mean, weight), sorted by mean
+        self._buffer = []
+
+    def add(self, value, weight=1):
+        if value != value:
+            return  # NaN has no place in an ordering
+        self._buffer.append((value, weight))
+        self.count += weight
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def extend(self, values):
+        """Adds many values with a single sort-and-compress"""
+        values = [value for value in values if value == value]
+        self._buffer.extend(zip(values, repeat(1)))
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other):
+        self._buffer.extend(other.centroids)
+        self._buffer.extend(other._buffer)
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        if not points:
+            return
+        # k1 scale function: a centroid may span one unit of k, so centroids stay small near the
+        # tails and may grow near the median. weight_limit is the cumulative weight where that unit ends.
+        scale = self.compression / (2 * math.pi)
+
+        def weight_limit(weight_before):
+            k = scale * math.asin(2 * min(weight_before / self.count, 1.0) - 1) + 1
+            return self.count * (math.sin(min(k / scale, math.pi / 2)) + 1) / 2
+
+        merged = []
+        mean, weight = points[0]
+        weight_before = 0
+        limit = weight_limit(0)
+        for point_mean, point_weight in points[1:]:
+            if weight_before + weight + point_weight <= limit:
+                mean += (point_mean - mean) * point_weight / (weight + point_weight)
+                weight += point_weight
+            else:
+                merged.append((mean, weight))
+                weight_before += weight
+                limit = weight_limit(weight_before)
+                mean, weight = point_mean, point_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def to_state(self):
+        self._compress()
+        return {"compression": self.compression, "count": self.count, "centroids": self.centroids}
+
+    @classmethod
+    def from_state(cls, state):
+        digest = cls(state["compression"])
+        digest.count = state["count"]
+        digest.centroids = [tuple(centroid) for centroid in state["centroids"]]
+        return digest
+
+    def quantile(self, q):
+        self._compress()
+        if not self.centroids:
+            return None
+        centers = []
+        cumulative = 0
+        for _, weight in self.centroids:
+            centers.append(cumulative + weight / 2)
+            cumulative += weight
+        target = q * self.count
+        if target <= centers[0]:
+            return self.centroids[0][0]
+        if target >= centers[-1]:
+            return self.centroids[-1][0]
+        upper = bisect.bisect_right(centers, target)
+        (low_mean, _), (high_mean, _) = self.centroids[upper - 1], self.centroids[upper]
+        fraction = (target - centers[upper - 1]) / (centers[upper] - centers[upper - 1])
+        return low_mean + fraction * (high_mean - low_mean)
+
+# Every finite double is a whole multiple of 2**-1074 (the smallest subnormal), so sums of them are exact integers of that unit
+SCALED_SUM_UNIT = 2 ** 1074
+
+def _scaled(value):
+    numerator, denominator = value.as_integer_ratio()
+    return numerator * (SCALED_SUM_UNIT // denominator)
 
-    # Create a dict for quick lookup of details by movie_id
-    details_dict = {detail['movie_id']: detail for detail in details_list if detail}
+class FeatureAccumulator:
+    """Single-pass, mergeable summary of one numeric feature
 
-    # Join the details with the original movies_list
-    enriched_movies = []
-    for movie in movies_to_process:
-        movie_id = movie["movie_id"]
-        if movie_id in details_dict:
-            # Remove movie_id from details to avoid duplication
-            details = details_dict[movie_id].copy()
-            details.pop('movie_id', None)
-            # Merge the dictionaries
-            enriched_movie = {**movie, **details}
-            enriched_movies.append(enriched_movie)
+    The sum is kept exactly, as an integer count of 2**-1074 units, so mean()
+    is the correctly rounded exact mean -- bit for bit what statistics.mean
+    returns -- in O(1) memory. variance() uses Welford's update (Chan et al.'s
+    formula to merge). median='exact' keeps the values in a compact array('d')
+    and matches statistics.median; median='tdigest' estimates it from a
+    t-digest in O(compression) memory instead.
+    """
+
+    def __init__(self, median=None, compression=100):
+        self.count = 0
+        self._scaled_sum = 0
+        self._non_finite_sum = None  # statistics.mean returns the plain float sum of any inf/nan values
+        self._welford_mean = 0.0
+        self._m2 = 0.0
+        self._values = array('d') if median == 'exact' else None
+        self._digest = TDigest(compression) if median == 'tdigest' else None
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        if math.isfinite(value):
+            self._scaled_sum += _scaled(value)
         else:
-            enriched_movies.append(movie)
+            self._non_finite_sum = (self._non_finite_sum or 0.0) + value
+        delta = value - self._welford_mean
+        self._welford_mean += delta / self.count
+        self._m2 += delta * (value - self._welford_mean)
+        if self._values is not None:
+            self._values.append(value)
+        if self._digest is not None:
+            self._digest.add(value)
 
-    return enriched_movies
+    def extend(self, values):
+        """Adds a list of floats at once, summing them exactly with a few C-speed fsum passes"""
+        if not values:
+            return
+        try:
+            # fsum is the correctly rounded exact sum; taking it again with the terms found so far
+            # subtracted gives the next term, until nothing is left. Usually two or three passes.
+            terms = []
+            term = math.fsum(values)
+            while term:
+                if not math.isfinite(term):
+                    raise OverflowError
+                terms.append(term)
+                term = math.fsum(chain(values, (-t for t in terms)))
+        except (OverflowError, ValueError):
+            for value in values:
+                self.add(value)
+            return
+
+        chunk = FeatureAccumulator()
+        chunk.count = len(values)
+        chunk._scaled_sum = sum(map(_scaled, terms))
+        chunk._welford_mean = terms[0] / chunk.count if terms else 0.0
+        deviations = map(operator.sub, values, repeat(chunk._welford_mean))
+        chunk._m2 = math.fsum(map(operator.mul, *tee(deviations)))
+        if self._values is not None:
+            chunk._values = array('d', values)
+        if self._digest is not None:
+            chunk._digest = TDigest(self._digest.compression)
+            chunk._digest.extend(values)
+        self.merge(chunk)
+
+    def merge(self, other):
+        """Folds another accumulator (e.g. a parallel shard's) into this one"""
+        if not other.count:
+            return
+        if not self.count:
+            self._welford_mean = other._welford_mean  # Then delta is 0 and nothing is lost to rounding
+        count = self.count + other.count
+        delta = other._welford_mean - self._welford_mean
+        self._welford_mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self._scaled_sum += other._scaled_sum
+        if other._non_finite_sum is not None:
+            self._non_finite_sum = (self._non_finite_sum or 0.0) + other._non_finite_sum
+        if self._values is not None and other._values is not None:
+            self._values.extend(other._values)
+        if self._digest is not None and other._digest is not None:
+            self._digest.merge(other._digest)
+
+    def to_state(self):
+        """JSON-serializable state; kept values are left out, so persist t-digest accumulators"""
+        return {
+            "count": self.count,
+            "scaled_sum": self._scaled_sum,
+            "non_finite_sum": self._non_finite_sum,
+            "welford_mean": self._welford_mean,
+            "m2": self._m2,
+            "digest": self._digest.to_state() if self._digest is not None else None,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls()
+        accumulator.count = state["count"]
+        accumulator._scaled_sum = state["scaled_sum"]
+        accumulator._non_finite_sum = state["non_finite_sum"]
+        accumulator._welford_mean = state["welford_mean"]
+        accumulator._m2 = state["m2"]
+        if state["digest"] is not None:
+            accumulator._digest = TDigest.from_state(state["digest"])
+        return accumulator
+
+    def mean(self):
+        if self._non_finite_sum is not None:
+            return self._non_finite_sum
+        return self._scaled_sum / (SCALED_SUM_UNIT * self.count)
 
-def calculate_statistics(movies_list):
-    """Calculate mean and median for numerical features"""
-    # Initialize dictionaries to store values for statistical calculations
-    numerical_features = ['vote_average', 'vote_count', 'popularity', 'runtime', 'budget', 'revenue']
-    values = {feature: [] for feature in numerical_features}
+    def variance(self):
+        """Sample variance, like statistics.variance"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def median(self):
+        if self._digest is not None:
+            return self._digest.quantile(0.5)
+        ordered = sorted(self._values)
+        middle = len(ordered) // 2
+        if len(ordered) % 2 == 1:
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+
+NUMERICAL_FEATURES = ['vote_average', 'vote_count', 'popularity', 'runtime', 'budget', 'revenue']
+# Use median for features likely to have outliers (budget, revenue); mean for the rest
+MEDIAN_FEATURES = ['budget', 'revenue', 'vote_count']
+STATS_CHUNK_SIZE = 4096  # Values buffered per feature before they're folded into its accumulator
+
+def feature_accumulators():
+    """An empty FeatureAccumulator per numerical feature, keeping values only where a median is needed"""
+    # Long-run state is persisted, so its medians come from t-digests rather than every value ever seen
+    median = 'tdigest' if IMPUTATION_STATS == 'long_run' else MEDIAN_ESTIMATOR
+    return {
+        feature: FeatureAccumulator(median if feature in MEDIAN_FEATURES else None, TDIGEST_COMPRESSION)
+        for feature in NUMERICAL_FEATURES
+    }
+
+def calculate_statistics(movies_list, imputation_state=None):
+    """Calculate mean and median for numerical features
+
+    With an ImputationState, only values it hasn't counted are accumulated, and the
+    statistics come from the state's long-run accumulators once they're folded in.
+    """
+    if imputation_state is not None:
+        new_rows, selected = imputation_state.new_rows(
+            [movie.get('movie_id') for movie in movies_list],
+            {feature: [movie.get(feature, _MISSING) for movie in movies_list] for feature in NUMERICAL_FEATURES}
+        )
+        movies_list = [
+            {feature: values[position] for feature, values in selected.items() if values[position] is not _MISSING}
+            for position in range(len(new_rows))
+        ]
+    accumulators = feature_accumulators()
+    pending = {feature: [] for feature in NUMERICAL_FEATURES}
     
-    # Collect all non-None values
+    # Accumulate all non-None values in a single pass, a bounded chunk at a time
     for movie in movies_list:
-        for feature in numerical_features:
+        for feature in NUMERICAL_FEATURES:
             if feature in movie and movie[feature] is not None:
-                values[feature].append(float(movie[feature]))  # Ensure values are floats
+                values = pending[feature]
+                values.append(float(movie[feature]))  # Ensure values are floats
+                if len(values) >= STATS_CHUNK_SIZE:
+                    accumulators[feature].extend(values)
+                    values.clear()
+    for feature, values in pending.items():
+        accumulators[feature].extend(values)
     
-    # Calculate statistics
+    if imputation_state is not None:
+        accumulators = imputation_state.merge(accumulators)
+    return summarize_features(accumulators)
+
+def partial_statistics(batch):
+    """Feature accumulators for one chunk of a MovieBatch, to be merged with the other chunks'"""
+    np = load_numpy() if TRANSFORM_ENGINE == 'numpy' else None
+    accumulators = feature_accumulators()
+    for feature in NUMERICAL_FEATURES:
+        column = batch.columns.get(feature)
+        if column is None:
+            continue
+        if np is not None and isinstance(column, NumericColumn):
+            accumulators[feature].extend(
+                np.frombuffer(column.values, np.float64)[np.frombuffer(column.kinds, np.uint8) >= KIND_INT].tolist()
+            )
+        else:
+            accumulators[feature].extend(column.present_values())
+    return accumulators
+
+def calculate_batch_statistics(batch, pool=None, imputation_state=None):
+    """calculate_statistics for a MovieBatch, reading each feature's column directly
+
+    Columns are summarized in TRANSFORM_CHUNK_ROWS chunks -- on the pool's
+    workers when one is given -- and the partials merged in chunk order, so
+    serial and parallel runs reduce identical partials to identical statistics.
+    """
+    if imputation_state is not None:
+        features = {name: batch.columns[name] for name in NUMERICAL_FEATURES if name in batch.columns}
+        new_rows, selected = imputation_state.new_rows(
+            batch.columns['movie_id'].decode(), {name: column.decode() for name, column in features.items()}
+        )
+        batch = MovieBatch({name: type(features[name]).from_values(values) for name, values in selected.items()},
+                           len(new_rows))
+    chunks = batch.chunks(TRANSFORM_CHUNK_ROWS, NUMERICAL_FEATURES)
+    partials = pool.map(partial_statistics, chunks) if pool else map(partial_statistics, chunks)
+    accumulators = feature_accumulators()
+    for part in partials:
+        for feature, accumulator in part.items():
+            accumulators[feature].merge(accumulator)
+    if imputation_state is not None:
+        accumulators = imputation_state.merge(accumulators)
+    return summarize_features(accumulators)
+
+def summarize_features(accumulators):
+    """Reduces each feature's accumulator to the mean or median used for imputation"""
     stats = {}
-    for feature in numerical_features:
-        if values[feature]:
-            # Use median for features likely to have outliers (budget, revenue)
-            if feature in ['budget', 'revenue', 'vote_count']:
-                stats[feature] = statistics.median(values[feature])
+    for feature in NUMERICAL_FEATURES:
+        accumulator = accumulators[feature]
+        if accumulator.count:
+            if feature in MEDIAN_FEATURES:
+                stats[feature] = accumulator.median()
                 logger.info(f"Median {feature}: {stats[feature]}")
-            # Use mean for more normally distributed features
             else:
-                stats[feature] = statistics.mean(values[feature])
-                logger.info(f"Mean {feature}: {stats[feature]}")
+                stats[feature] = accumulator.mean()
+                logger.info(f"Mean {feature}: {stats[feature]} (std dev {math.sqrt(accumulator.variance()):.4g})")
         else:
             # Fallback to 0 if no data available
             stats[feature] = 0
@@ -199,14 +1929,95 @@ def calculate_statistics(movies_list):
             
     return stats
 
-def clean_transform_data(movies_list):
+class ImputationState:
+    """Feature accumulators carried across runs in the state store, and which movies each already counts
+
+    Each run folds in only values the state hasn't counted, so a movie that stays
+    popular for weeks is counted once; later changes to a counted movie's figures
+    are not reflected. A movie is counted per feature the first time it has a
+    value for it, so one whose details failed to fetch still has its budget
+    counted by a later run. The counted features are kept as a bitmask per movie,
+    one state-store document per span of id_span consecutive movie_ids. A
+    document never holds more than id_span movies, and a run reads only the spans
+    its own movies fall in, so its reads are bounded by its size, not by history.
+    """
+
+    def __init__(self, store, accumulators=None, movies=0, id_span=IMPUTATION_ID_SPAN):
+        self.store = store
+        self.id_span = id_span
+        self.accumulators = accumulators or feature_accumulators()
+        self.movies = movies
+        self.new_movies = 0
+        self._counted = {}  # Span -> {movie_id: bitmask over NUMERICAL_FEATURES}, loaded by new_rows()
+        self._dirty = set()
+
+    @classmethod
+    def load(cls, store):
+        state = store.get(IMPUTATION_STATS_KEY)
+        if state is None:
+            return cls(store)
+        accumulators = {feature: FeatureAccumulator.from_state(state["features"][feature]) for feature in NUMERICAL_FEATURES}
+        return cls(store, accumulators, state["movies"])
+
+    def new_rows(self, movie_ids, feature_values):
+        """Rows with a value not yet counted, and each feature's values for those rows, marking them counted
+
+        feature_values maps features to one value per row; values already
+        counted come back as _MISSING so the accumulators skip them.
+        """
+        rows = []
+        selected = {feature: [] for feature in feature_values}
+        # A feature's bit is its position in NUMERICAL_FEATURES, so new features go on the end
+        bits = [(1 << NUMERICAL_FEATURES.index(feature), feature, values) for feature, values in feature_values.items()]
+        for index, movie_id in enumerate(movie_ids):
+            key = _movie_key(movie_id)
+            if key is None:
+                continue
+            bucket = key // self.id_span
+            if bucket not in self._counted:
+                self._counted[bucket] = self.store.get(f"imputation/movies/{bucket * self.id_span}") or {}
+            counted = self._counted[bucket].get(str(key), 0)
+            marked = counted
+            for bit, feature, values in bits:
+                if not counted & bit and values[index] is not None and values[index] is not _MISSING:
+                    marked |= bit
+            if marked == counted:
+                continue
+            if not counted:
+                self.new_movies += 1
+            self._counted[bucket][str(key)] = marked
+            self._dirty.add(bucket)
+            rows.append(index)
+            for bit, feature, values in bits:
+                selected[feature].append(values[index] if (marked & ~counted) & bit else _MISSING)
+        return rows, selected
+
+    def merge(self, accumulators):
+        """Folds this run's accumulators in, returning the long-run ones"""
+        for feature, accumulator in accumulators.items():
+            self.accumulators[feature].merge(accumulator)
+        return self.accumulators
+
+    def save(self, store):
+        for bucket in self._dirty:
+            store.put(f"imputation/movies/{bucket * self.id_span}", self._counted[bucket])
+        store.put(IMPUTATION_STATS_KEY, {
+            "features": {feature: accumulator.to_state() for feature, accumulator in self.accumulators.items()},
+            "movies": self.movies + self.new_movies
+        })
+
+    def snapshot(self):
+        return {"movies": self.movies + self.new_movies, "new_movies": self.new_movies}
+
+def clean_transform_data(movies_list, imputation_state=None):
     """Performs data cleaning, normalization, and feature engineering using mean/median imputation"""
     if not movies_list:
         logger.warning("No movie data to process!")
         return []
     
     # Calculate statistics for imputation
-    stats = calculate_statistics(movies_list)
+    stats = calculate_statistics(movies_list, imputation_state)
+    as_of = datetime.now(timezone.utc).date()
     
     cleaned_movies = []
     
@@ -228,16 +2039,8 @@ def clean_transform_data(movies_list):
         movie.setdefault('original_language', 'Unknown')
         movie.setdefault('keywords', '')
         
-        # Convert release_date to a standardized format
-        if 'release_date' in movie and movie['release_date']:
-            try:
-                # Parse the date
-                date_obj = datetime.strptime(movie['release_date'], '%Y-%m-%d')
-                movie['release_year'] = date_obj.year
-            except (ValueError, TypeError):
-                movie['release_year'] = None
-        else:
-            movie['release_year'] = None
+        # Convert release_date to a standardized format (release_year, plus month/quarter/age with DATE_FEATURES)
+        movie.update(date_features(parse_release_date(movie.get('release_date')), as_of))
         
         # Feature Engineering
         movie['profit'] = movie['revenue'] - movie['budget']
@@ -272,53 +2075,1382 @@ def clean_transform_data(movies_list):
     logger.info("Data cleaning and feature engineering completed.")
     return list(unique_movies.values())
 
-def upload_to_s3(movies_data):
+# Text fields clean_transform_data fills in when a record doesn't have them
+TEXT_DEFAULTS = {
+    'overview': 'No overview available',
+    'tagline': '',
+    'genres': 'Unknown',
+    'production_companies': 'Unknown',
+    'spoken_languages': 'Unknown',
+    'original_language': 'Unknown',
+    'keywords': '',
+}
+
+def parse_release_date(value):
+    """Parses a YYYY-MM-DD release date, or returns None if it's empty or doesn't parse
+
+    Well-formed dates are sliced at fixed offsets and validated by date(),
+    several times faster than strptime. Anything else (e.g. unpadded
+    '2020-1-5') still goes through strptime, so what parses is unchanged.
+    """
+    if not value:
+        return None
+    if type(value) is str and len(value) == 10 and value[4] == '-' and value[7] == '-' and value.isascii():
+        year, month, day = value[:4], value[5:7], value[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            try:
+                return date(int(year), int(month), int(day))
+            except ValueError:
+                return None
     try:
-        csv_buffer = StringIO()
-        if not movies_data:
-            writer = csv.DictWriter(csv_buffer, fieldnames=["movie_id", "title", "message"])
-            writer.writeheader()
-            writer.writerow({"movie_id": 0, "title": "No Data", "message": "No movie data was processed"})
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None
+
+def date_features(release_date, as_of):
+    """release_year, and with DATE_FEATURES month, quarter and days since release, for a parsed release date"""
+    features = {'release_year': release_date.year if release_date else None}
+    if DATE_FEATURES:
+        features['release_month'] = release_date.month if release_date else None
+        features['release_quarter'] = (release_date.month - 1) // 3 + 1 if release_date else None
+        features['days_since_release'] = (as_of - release_date).days if release_date else None
+    return features
+
+def create_transform_pool():
+    """A TRANSFORM_WORKERS process pool, or None where multiprocessing isn't available
+
+    AWS Lambda has no /dev/shm, so the pool's semaphores fail with OSError
+    (ENOSYS) there; the transform then runs in this process, with the same output.
+    """
+    try:
+        return ProcessPoolExecutor(max_workers=TRANSFORM_WORKERS)
+    except OSError as e:
+        logger.warning(f"TRANSFORM_WORKERS={TRANSFORM_WORKERS} needs multiprocessing, which is unavailable here "
+                       f"({e}); transforming in a single process")
+        return None
+
+def clean_transform_batch(batch, imputation_state=None):
+    """clean_transform_data on a MovieBatch, a column at a time; produces the same rows
+
+    Release dates (and DATE_FEATURES) are parsed once per distinct value rather than once per row.
+    Batches whose numeric features aren't plain numbers go through the record
+    path, so odd inputs behave exactly as they always have.
+    """
+    if not len(batch):
+        logger.warning("No movie data to process!")
+        return MovieBatch()
+    column_types = {name: type(column) for name, column in batch.columns.items()}
+    if any(column_types.get(feature, NumericColumn) is not NumericColumn for feature in NUMERICAL_FEATURES + ['movie_id']) \
+            or any(column_types.get(field) is NumericColumn for field in TEXT_DEFAULTS) \
+            or column_types.get('release_date', StringColumn) is not StringColumn:
+        return MovieBatch.from_records(clean_transform_data(batch.to_records(), imputation_state))
+    if 'movie_id' not in batch.columns or KIND_MISSING in batch.columns['movie_id'].kinds:
+        raise KeyError('movie_id')
+
+    np = load_numpy() if TRANSFORM_ENGINE == 'numpy' else None
+    for feature in NUMERICAL_FEATURES:
+        batch.columns.setdefault(feature, NumericColumn(array('d', bytes(8 * len(batch))), bytearray(len(batch))))
+    for field in TEXT_DEFAULTS:
+        batch.columns.setdefault(field, StringColumn(array('i', bytes(4 * len(batch)))))
+    as_of = datetime.now(timezone.utc).date()
+
+    pool = create_transform_pool() if TRANSFORM_WORKERS > 1 and len(batch) > TRANSFORM_CHUNK_ROWS else None
+    if pool:
+        # Workers summarize their chunks, the statistics are reduced once here, then workers
+        # transform their chunks with them; deduplication needs every row, so it stays here
+        with pool:
+            stats = calculate_batch_statistics(batch, pool, imputation_state)
+            chunks = pool.map(transform_chunk, batch.chunks(TRANSFORM_CHUNK_ROWS), repeat(stats), repeat(as_of))
+            batch = MovieBatch.concat(chunks)
+    else:
+        stats = calculate_batch_statistics(batch, imputation_state=imputation_state)
+        transform_chunk(batch, stats, as_of)
+
+    keep = _first_row_per_movie(batch, np)
+    if len(keep) < len(batch):
+        logger.info(f"Removed {len(batch) - len(keep)} duplicate movies during cleaning")
+        batch = batch.take(keep)
+
+    logger.info("Data cleaning and feature engineering completed.")
+    return batch
+
+def transform_chunk(batch, stats, as_of):
+    """Imputes with the run's statistics and derives features for a batch (or one chunk of it), in place"""
+    if TRANSFORM_ENGINE == 'numpy':
+        _transform_columns_numpy(batch, stats, as_of, load_numpy())
+    else:
+        _transform_columns(batch, stats, as_of)
+    return batch
+
+def _date_feature_lookup(release_dates, as_of):
+    """Per release_date code, the value list and kind bytes of each date feature, parsing each distinct date once"""
+    dictionary = release_dates.dictionary if release_dates is not None else [_MISSING]
+    features = [date_features(parse_release_date(value) if code > 1 else None, as_of)
+                for code, value in enumerate(dictionary)]
+    return {
+        name: ([float(feature[name] or 0) for feature in features],
+               bytes(KIND_NONE if feature[name] is None else KIND_INT for feature in features))
+        for name in features[0]
+    }
+
+def _transform_columns(batch, stats, as_of):
+    """Imputes, fills and derives columns in place"""
+    columns = batch.columns
+
+    # Impute missing values with mean or median
+    for feature in NUMERICAL_FEATURES:
+        columns[feature].fill(stats[feature])
+
+    # Fill non-numerical missing values
+    for field, default in TEXT_DEFAULTS.items():
+        columns[field].fill(default)
+
+    release_dates = columns.get('release_date')
+    codes = release_dates.codes if release_dates is not None else array('i', bytes(4 * len(batch)))
+    for name, (values, kinds) in _date_feature_lookup(release_dates, as_of).items():
+        columns[name] = NumericColumn(array('d', map(values.__getitem__, codes)), bytearray(map(kinds.__getitem__, codes)))
+
+    # Feature Engineering: values are exact doubles, so these match the per-row int/float arithmetic
+    budget, revenue = columns['budget'], columns['revenue']
+    profit = array('d', map(float.__sub__, revenue.values, budget.values))
+    columns['profit'] = NumericColumn(profit, bytearray(map(max, revenue.kinds, budget.kinds)))
+
+    roi = NumericColumn()
+    for gain, cost, income in zip(profit, budget.values, revenue.values):
+        if cost > 0:
+            roi.append(gain / cost)
+        else:
+            roi.append(0 if income == 0 else float('inf'))
+    columns['roi'] = roi
+
+    categories = StringColumn()
+    low, medium, high = (categories.encode(name) for name in ('Low', 'Medium', 'High'))
+    categories.codes = array('i', [low if p < 100 else medium if p < 500 else high for p in columns['popularity'].values])
+    columns['popularity_category'] = categories
+
+def _first_row_per_movie(batch, np=None):
+    """Indices of each movie_id's first row, for deduplication"""
+    if np is None:
+        seen = set()
+        keep = []
+        for index, movie_id in enumerate(batch.columns['movie_id'].decode()):
+            if movie_id not in seen:
+                seen.add(movie_id)
+                keep.append(index)
+        return keep
+
+    # None ids count as one id, and NaN never equals itself so each NaN row is kept
+    movie_ids = np.frombuffer(batch.columns['movie_id'].values, np.float64)
+    is_none = np.frombuffer(batch.columns['movie_id'].kinds, np.uint8) == KIND_NONE
+    comparable = np.flatnonzero(~is_none & ~np.isnan(movie_ids))
+    _, first = np.unique(movie_ids[comparable], return_index=True)
+    keep = np.concatenate([comparable[first], np.flatnonzero(np.isnan(movie_ids) & ~is_none), np.flatnonzero(is_none)[:1]])
+    return np.sort(keep).tolist()
+
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("TRANSFORM_ENGINE=numpy needs numpy; add a Lambda layer that provides it")
+    return numpy
+
+def _transform_columns_numpy(batch, stats, as_of, np):
+    """_transform_columns with NumPy: masks for imputation, guarded division for ROI, searchsorted for bins
+
+    The arrays are viewed in place and the arithmetic is the same IEEE double
+    arithmetic, with int/float kinds tracked alongside, so rows come out
+    identical to the Python path.
+    """
+    columns = batch.columns
+    numeric = {name: (np.frombuffer(column.values, np.float64), np.frombuffer(column.kinds, np.uint8))
+               for name, column in columns.items() if isinstance(column, NumericColumn)}
+
+    for feature in NUMERICAL_FEATURES:
+        values, kinds = numeric[feature]
+        empty = kinds < KIND_INT
+        values[empty] = stats[feature]
+        kinds[empty] = KIND_INT if isinstance(stats[feature], int) else KIND_FLOAT
+
+    for field, default in TEXT_DEFAULTS.items():
+        column = columns[field]
+        if isinstance(column, StringColumn):
+            codes = np.frombuffer(column.codes, np.intc)
+            codes[codes == 0] = column.encode(default)
+        else:
+            column.fill(default)
+
+    # Dates were parsed once per distinct value; rows just gather their code's features
+    release_dates = columns.get('release_date')
+    codes = np.frombuffer(release_dates.codes, np.intc) if release_dates is not None else np.zeros(len(batch), np.intc)
+    for name, (values, kinds) in _date_feature_lookup(release_dates, as_of).items():
+        columns[name] = NumericColumn(array('d', np.asarray(values)[codes].tobytes()),
+                                      bytearray(np.frombuffer(kinds, np.uint8)[codes].tobytes()))
+
+    (budget, budget_kinds), (revenue, revenue_kinds) = numeric['budget'], numeric['revenue']
+    profit = revenue - budget
+    columns['profit'] = NumericColumn(array('d', profit.tobytes()),
+                                      bytearray(np.maximum(revenue_kinds, budget_kinds).tobytes()))
+
+    # Budgets that aren't positive give 0 (an int) when there's no revenue either, else inf
+    positive = budget > 0
+    roi = np.where(revenue == 0, 0.0, np.inf)
+    np.divide(profit, budget, out=roi, where=positive)
+    roi_kinds = np.where(positive | (revenue != 0), KIND_FLOAT, KIND_INT).astype(np.uint8)
+    columns['roi'] = NumericColumn(array('d', roi.tobytes()), bytearray(roi_kinds.tobytes()))
+
+    # Bin edges are inclusive on the left, like `< 100` / `< 500`; NaN sorts last, landing in High
+    categories = StringColumn()
+    category_codes = np.array([categories.encode(name) for name in ('Low', 'Medium', 'High')], np.intc)
+    bins = np.searchsorted(np.array([100.0, 500.0]), numeric['popularity'][0], side='right')
+    categories.codes = array('i', category_codes[bins].tobytes())
+    columns['popularity_category'] = categories
+
+# Column names and Athena types of the daily output, matching Athena_Analytics_Queries.sql
+OUTPUT_SCHEMA = [
+    ("adult", "STRING"),
+    ("budget", "BIGINT"),
+    ("genres", "STRING"),
+    ("homepage", "STRING"),
+    ("imdb_id", "STRING"),
+    ("keywords", "STRING"),
+    ("movie_id", "BIGINT"),
+    ("original_language", "STRING"),
+    ("overview", "STRING"),
+    ("popularity", "DOUBLE"),
+    ("popularity_category", "STRING"),
+    ("poster_url", "STRING"),
+    ("production_companies", "STRING"),
+    ("profit", "BIGINT"),
+    ("release_date", "DATE"),
+    ("release_year", "INT"),
+    ("revenue", "BIGINT"),
+    ("roi", "DOUBLE"),
+    ("runtime", "INT"),
+    ("spoken_languages", "STRING"),
+    ("status", "STRING"),
+    ("tagline", "STRING"),
+    ("title", "STRING"),
+    ("vote_average", "DOUBLE"),
+    ("vote_count", "INT")
+]
+if DATE_FEATURES:
+    # Kept in name order: the CSV writer orders columns by name, and the CSV table reads them by position
+    OUTPUT_SCHEMA = sorted(OUTPUT_SCHEMA + [("days_since_release", "INT"), ("release_month", "INT"), ("release_quarter", "INT")])
+
+def record_chunks(movies_data, chunk_rows):
+    """Yields rows as lists of at most chunk_rows dicts, from a list of records or a MovieBatch"""
+    for start in range(0, len(movies_data), chunk_rows):
+        if isinstance(movies_data, MovieBatch):
+            yield movies_data.to_records(start, start + chunk_rows)
+        else:
+            yield movies_data[start:start + chunk_rows]
+
+def write_csv(movies_data, sink, chunk_rows=UPLOAD_CHUNK_ROWS):
+    """Writes rows as UTF-8 CSV to a binary sink chunk_rows at a time, one column per field seen, sorted by name"""
+    if isinstance(movies_data, MovieBatch) and movies_data:
+        fieldnames = movies_data.field_names()
+    elif movies_data:
+        fields = set()
+        for movie in movies_data:
+            fields.update(movie.keys())
+        fieldnames = sorted(fields)
+    else:
+        fieldnames = ["movie_id", "title", "message"]
+        movies_data = [{"movie_id": 0, "title": "No Data", "message": "No movie data was processed"}]
+
+    csv_buffer = StringIO()
+    writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for rows in record_chunks(movies_data, chunk_rows):
+        writer.writerows(rows)
+        sink.write(csv_buffer.getvalue().encode("utf-8"))
+        csv_buffer.seek(0)
+        csv_buffer.truncate()
+
+def serialize_csv(movies_data):
+    """Serializes rows to CSV text with one column per field seen, sorted by name"""
+    sink = io.BytesIO()
+    write_csv(movies_data, sink)
+    return sink.getvalue().decode("utf-8")
+
+def _coerce_output_value(value, athena_type):
+    """Converts a transformed value to the Python type pyarrow expects for an Athena column type"""
+    if value is None or value == "":
+        return None
+    if athena_type in ("BIGINT", "INT"):
+        value = float(value)
+        # Imputed means/medians can be fractional; inf/nan (e.g. undefined ROI) has no integer form
+        return int(round(value)) if value == value and value not in (float("inf"), float("-inf")) else None
+    if athena_type == "DOUBLE":
+        return float(value)
+    if athena_type == "DATE":
+        if isinstance(value, date):
+            return value  # Read back from a columnar file
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            return None
+    return str(value)
+
+def _arrow_schema(pa, columns):
+    """pyarrow schema for (name, Athena type) columns"""
+    arrow_types = {"STRING": pa.string(), "BIGINT": pa.int64(), "INT": pa.int32(), "DOUBLE": pa.float64(),
+                   "DATE": pa.date32()}
+    return pa.schema([(name, arrow_types[athena_type]) for name, athena_type in columns])
+
+def _arrow_table(pa, schema, columns, rows):
+    """pyarrow Table of rows (dicts) with their values coerced to the columns' types"""
+    arrays = [
+        pa.array([_coerce_output_value(movie.get(name), athena_type) for movie in rows], type=schema.field(name).type)
+        for name, athena_type in columns
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_columnar(movies_data, sink, output_format="parquet", compression="snappy", row_group_size=100000,
+                   columns=None):
+    """Writes rows to a binary sink as Parquet or ORC typed by OUTPUT_SCHEMA (or the given subset of it)
+
+    Arrow arrays are built one row group at a time, so only that many rows are
+    held in columnar form at once. Needs pyarrow, which isn't in the Lambda
+    runtime; attach a layer that provides it (e.g. AWS SDK for pandas).
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError(f"OUTPUT_FORMAT={output_format} needs pyarrow; add a Lambda layer that provides it")
+
+    columns = columns or OUTPUT_SCHEMA
+    schema = _arrow_schema(pa, columns)
+
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        # Row-group min/max statistics let Athena skip row groups a filter can't match
+        writer = pq.ParquetWriter(sink, schema, compression=compression, write_statistics=True)
+        write = partial(writer.write_table, row_group_size=row_group_size)
+    elif output_format == "orc":
+        import pyarrow.orc as orc
+        writer = orc.ORCWriter(sink, compression=compression, stripe_size=64 * 1024 * 1024)
+        write = writer.write
+    else:
+        raise ValueError(f"Unknown columnar format: {output_format}")
+
+    try:
+        for rows in record_chunks(movies_data, row_group_size) if len(movies_data) else [[]]:
+            write(_arrow_table(pa, schema, columns, rows))
+    finally:
+        writer.close()
+
+def serialize_columnar(movies_data, output_format="parquet", compression="snappy", row_group_size=100000,
+                       columns=None):
+    """Serializes rows to Parquet or ORC bytes typed by OUTPUT_SCHEMA (or the given subset of it)"""
+    sink = io.BytesIO()
+    write_columnar(movies_data, sink, output_format, compression, row_group_size, columns)
+    return sink.getvalue()
+
+def output_partitions(movies_data, run_date):
+    """Splits the daily output into (file_stem, rows) pairs following OUTPUT_PARTITIONING
+
+    'flat' keeps movies_data_YYYY-MM-DD at the top of OUTPUT_PREFIX, 'date'
+    writes it under dt=YYYY-MM-DD/, and 'date_release_year' further splits rows
+    into release_year=YYYY/ (release_year=0 when unknown), dropping the column
+    from the rows since the partition carries it.
+    """
+    date = run_date.strftime("%Y-%m-%d")
+    if OUTPUT_PARTITIONING == 'flat':
+        return [(f"{OUTPUT_PREFIX}/movies_data_{date}", movies_data)]
+    if OUTPUT_PARTITIONING == 'date':
+        return [(f"{OUTPUT_PREFIX}/dt={date}/movies_data_{date}", movies_data)]
+    if OUTPUT_PARTITIONING == 'date_release_year' and isinstance(movies_data, MovieBatch):
+        release_years = movies_data.columns.get('release_year')
+        by_year = {}
+        for index, year in enumerate(release_years.decode() if release_years else [None] * len(movies_data)):
+            by_year.setdefault(year if year is not _MISSING and year else 0, []).append(index)
+        return [
+            (f"{OUTPUT_PREFIX}/dt={date}/release_year={year}/movies_data_{date}",
+             movies_data.take(indices).drop('release_year'))
+            for year, indices in sorted((by_year or {0: []}).items())
+        ]
+    if OUTPUT_PARTITIONING == 'date_release_year':
+        by_year = {}
+        for movie in movies_data:
+            row = dict(movie)
+            by_year.setdefault(row.pop('release_year', None) or 0, []).append(row)
+        return [
+            (f"{OUTPUT_PREFIX}/dt={date}/release_year={year}/movies_data_{date}", rows)
+            for year, rows in sorted((by_year or {0: []}).items())
+        ]
+    raise ValueError(f"Unknown output partitioning: {OUTPUT_PARTITIONING}")
+
+class S3MultipartWriter(io.RawIOBase):
+    """Write-only file object that streams its bytes to S3 as a multipart upload
+
+    A part is sent as soon as part_size bytes accumulate, so memory stays at
+    about one part however large the object gets; an object smaller than one
+    part goes up with a single put_object instead. Call complete() to finish
+    the upload. Leaving a with block on an exception aborts it, so no orphaned
+    parts are left behind to be billed.
+    """
+
+    def __init__(self, s3, bucket, key, part_size=UPLOAD_PART_SIZE):
+        super().__init__()
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self.parts = []
+        self._upload_id = None
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key)["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                       PartNumber=part_number, Body=bytes(self._buffer))
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+        self._buffer.clear()
+
+    def complete(self):
+        """Uploads whatever is buffered and makes the object visible"""
+        if self._upload_id is None:
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
         else:
-            all_fields = sorted(set().union(*(m.keys() for m in movies_data)))
-            writer = csv.DictWriter(csv_buffer, fieldnames=all_fields)
-            writer.writeheader()
-            writer.writerows(movies_data)
+            if self._buffer:
+                self._upload_part()
+            self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                              MultipartUpload={"Parts": self.parts})
+            self._upload_id = None
+        self._buffer.clear()
+
+    def abort(self):
+        """Discards the buffer and any parts already uploaded"""
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+        self._buffer.clear()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        return super().__exit__(exc_type, exc_value, traceback)
+
+CSV_COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+def write_output(movies_data, sink, exclude_columns=(), schema=None):
+    """Streams rows in OUTPUT_FORMAT into a binary sink, compressing CSV per CSV_COMPRESSION
+
+    Columnar formats are typed by schema, OUTPUT_SCHEMA unless another table's is given.
+    """
+    if OUTPUT_FORMAT != 'csv':
+        columns = [column for column in schema or OUTPUT_SCHEMA if column[0] not in exclude_columns]
+        write_columnar(movies_data, sink, OUTPUT_FORMAT, OUTPUT_COMPRESSION, PARQUET_ROW_GROUP_SIZE, columns)
+        return
+
+    if CSV_COMPRESSION == 'none':
+        write_csv(movies_data, sink)
+        return
+    if CSV_COMPRESSION == 'gzip':
+        compressor = gzip.GzipFile(fileobj=sink, mode='wb', mtime=0)
+    elif CSV_COMPRESSION == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("CSV_COMPRESSION=zstd needs zstandard; add a Lambda layer that provides it")
+        compressor = zstandard.ZstdCompressor().stream_writer(sink, closefd=False)
+    else:
+        raise ValueError(f"Unknown CSV compression: {CSV_COMPRESSION}")
+    # Closing the compressor flushes its trailer into the sink but leaves the sink open
+    with compressor:
+        write_csv(movies_data, compressor)
+
+def output_digest(movies_data, exclude_columns=()):
+    """SHA-256 of the rows and the writer settings that shape the file, without serializing it"""
+    digest = hashlib.sha256(json.dumps(
+        [OUTPUT_FORMAT, OUTPUT_COMPRESSION, CSV_COMPRESSION, PARQUET_ROW_GROUP_SIZE, OUTPUT_SCHEMA]).encode())
+    for chunk in record_chunks(movies_data, UPLOAD_CHUNK_ROWS):
+        for row in chunk:
+            digest.update(json.dumps({k: v for k, v in row.items() if k not in exclude_columns},
+                                     sort_keys=True, default=str).encode())
+            digest.update(b"\n")
+    return digest.hexdigest()
+
+def output_digest_key(file_key):
+    """State-store key for an output's digest: its S3 key without the run date, so each run compares with the last"""
+    return "output_digests/" + re.sub(r"dt=\d{4}-\d{2}-\d{2}/|_\d{4}-\d{2}-\d{2}", "", file_key)
+
+def copy_unchanged_output(s3, source_key, file_key):
+    """Gives file_key the same content as the last run's source_key with a server-side copy; False if that is gone"""
+    if source_key == file_key:
+        logger.info(f"s3://{S3_BUCKET_NAME}/{file_key} is unchanged; skipping upload")
+        return True
+    try:
+        s3.copy_object(Bucket=S3_BUCKET_NAME, Key=file_key, CopySource={"Bucket": S3_BUCKET_NAME, "Key": source_key})
+    except s3.exceptions.NoSuchKey:
+        # Compacted or deleted since; the caller uploads the file as usual
+        return False
+    logger.info(f"s3://{S3_BUCKET_NAME}/{file_key} is unchanged since s3://{S3_BUCKET_NAME}/{source_key}; copied it")
+    return True
 
-        # ✅ Use current date to create a new file name each day
-        date_suffix = datetime.now().strftime("%Y-%m-%d")
-        file_key = f"daily_outputs/movies_data_{date_suffix}.csv"
+def upload_to_s3(movies_data, file_stem=None):
+    try:
+        # ✅ Use current date to create a new file name (or dt= partition) each day
+        if file_stem is None:
+            outputs = output_partitions(movies_data, datetime.now())
+        else:
+            outputs = [(file_stem, movies_data)]
+        partition_columns = ("release_year",) if file_stem is None and OUTPUT_PARTITIONING == 'date_release_year' else ()
+        suffix = CSV_COMPRESSION_SUFFIXES.get(CSV_COMPRESSION, '') if OUTPUT_FORMAT == 'csv' else ''
 
         s3 = boto3.client("s3")
-        s3.put_object(Bucket=S3_BUCKET_NAME, Key=file_key, Body=csv_buffer.getvalue())
-        logger.info(f"Uploaded daily ETL to s3://{S3_BUCKET_NAME}/{file_key}")
+        for stem, rows in outputs:
+            file_key = f"{stem}.{OUTPUT_FORMAT}{suffix}"
+            if CHANGE_DETECTION:
+                digest = output_digest(rows, partition_columns)
+                previous = state_store.get(output_digest_key(file_key)) or {}
+                if previous.get("sha256") == digest and copy_unchanged_output(s3, previous["key"], file_key):
+                    # The newest copy becomes the source, so compacting older days doesn't break the next copy
+                    state_store.put(output_digest_key(file_key), {"sha256": digest, "key": file_key})
+                    continue
+            # Rows are serialized straight into the upload, so the full file body is never held in memory
+            with S3MultipartWriter(s3, S3_BUCKET_NAME, file_key) as writer:
+                write_output(rows, writer, partition_columns)
+                writer.complete()
+            logger.info(f"Uploaded daily ETL to s3://{S3_BUCKET_NAME}/{file_key} "
+                        f"({writer.tell()} bytes, {len(writer.parts) or 1} part(s))")
+            if CHANGE_DETECTION:
+                state_store.put(output_digest_key(file_key), {"sha256": digest, "key": file_key})
         return True
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise
 
+def read_output(source):
+    """Reads rows written by write_output back from a binary file object, as dicts
+
+    CSV values come back as strings ('' where the value was None), columnar
+    values with their column types.
+    """
+    if OUTPUT_FORMAT == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(source).to_pylist()
+    if OUTPUT_FORMAT == 'orc':
+        import pyarrow.orc as orc
+        return orc.read_table(source).to_pylist()
+
+    if CSV_COMPRESSION == 'gzip':
+        source = gzip.GzipFile(fileobj=source, mode='rb')
+    elif CSV_COMPRESSION == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("CSV_COMPRESSION=zstd needs zstandard; add a Lambda layer that provides it")
+        source = zstandard.ZstdDecompressor().stream_reader(source)
+    return list(csv.DictReader(io.TextIOWrapper(source, encoding='utf-8', newline='')))
+
+def _movie_key(movie_id):
+    """movie_id as an int, whether it came from the pipeline or back from a CSV file; None when unusable"""
+    try:
+        return int(float(movie_id))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _stored_form(movie):
+    """A row as write_output stores it, for telling changed rows from ones already in the table"""
+    if OUTPUT_FORMAT == 'csv':
+        return {name: str(value) for name, value in movie.items() if value is not None and value != ''}
+    stored = {name: _coerce_output_value(movie.get(name), athena_type) for name, athena_type in OUTPUT_SCHEMA}
+    return {name: 'nan' if value != value else value for name, value in stored.items()}
+
+def row_fingerprint(movie):
+    """Stable digest of a row's fields, leaving out FINGERPRINT_EXCLUDED_FIELDS"""
+    fields = sorted((name, value) for name, value in movie.items() if name not in FINGERPRINT_EXCLUDED_FIELDS)
+    canonical = json.dumps(fields, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+class ChangeDetector:
+    """Compares rows with the fingerprints previous runs recorded, one state-store document per movie_id bucket
+
+    Only the buckets holding one of this run's movies are loaded, so a run costs
+    O(its rows) however many movies earlier runs have seen.
+    """
+
+    def __init__(self, store, buckets=CURRENT_STATE_BUCKETS):
+        self.store = store
+        self.buckets = buckets
+        self._fingerprints = {}  # Bucket -> {movie_id: fingerprint}, loaded and updated by classify()
+        self._dirty = set()  # Buckets holding a new or changed fingerprint
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0}
+
+    def classify(self, movies_data):
+        """Records fingerprints for the rows, returning the indices of new or changed ones"""
+        changed_rows = []
+        index = 0
+        for rows in record_chunks(movies_data, UPLOAD_CHUNK_ROWS):
+            for movie in rows:
+                key = _movie_key(movie.get('movie_id'))
+                if key is None:
+                    status = "new"  # Nothing to match it against
+                else:
+                    bucket = key % self.buckets
+                    if bucket not in self._fingerprints:
+                        self._fingerprints[bucket] = self.store.get(f"fingerprints/{bucket}") or {}
+                    fingerprint = row_fingerprint(movie)
+                    previous = self._fingerprints[bucket].get(str(key))
+                    status = "new" if previous is None else "unchanged" if previous == fingerprint else "changed"
+                    if status != "unchanged":
+                        self._fingerprints[bucket][str(key)] = fingerprint
+                        self._dirty.add(bucket)
+                self.counts[status] += 1
+                if status != "unchanged":
+                    changed_rows.append(index)
+                index += 1
+        return changed_rows
+
+    def save(self):
+        """Persists the buckets whose fingerprints this run added or changed"""
+        for bucket in sorted(self._dirty):
+            self.store.put(f"fingerprints/{bucket}", self._fingerprints[bucket])
+        self._dirty.clear()
+
+    def snapshot(self):
+        return dict(self.counts)
+
+class LogHistogram:
+    """Quantile sketch counting values in logarithmic buckets (DDSketch's layout)
+
+    Quantiles come back within relative_accuracy of the true value, sketches
+    merge by adding counts, and unlike a t-digest a value can be removed again.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive = {}  # Bucket index -> count; bucket i holds (gamma**(i-1), gamma**i]
+        self.negative = {}  # The same for magnitudes of negative values
+        self.zero = 0
+
+    @property
+    def count(self):
+        return self.zero + sum(self.positive.values()) + sum(self.negative.values())
+
+    def add(self, value, count=1):
+        """Adds count occurrences of value; a negative count removes them"""
+        if value == 0:
+            self.zero += count
+            return
+        buckets = self.positive if value > 0 else self.negative
+        index = math.ceil(math.log(abs(value)) / self._log_gamma)
+        buckets[index] = buckets.get(index, 0) + count
+        if not buckets[index]:
+            del buckets[index]
+
+    def _value(self, index):
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def quantile(self, q):
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive))
+
+    def to_state(self):
+        return {"relative_accuracy": self.relative_accuracy, "positive": self.positive,
+                "negative": self.negative, "zero": self.zero}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state["relative_accuracy"])
+        # JSON object keys are strings
+        sketch.positive = {int(index): count for index, count in state["positive"].items()}
+        sketch.negative = {int(index): count for index, count in state["negative"].items()}
+        sketch.zero = state["zero"]
+        return sketch
+
+ROLLUP_DIMENSIONS = ['release_year', 'genres', 'original_language', 'popularity_category']
+ROLLUP_MEASURES = ['budget', 'revenue', 'profit', 'roi', 'vote_average', 'popularity']
+ROLLUP_SKETCHED_MEASURES = ['revenue', 'roi']
+
+def _finite_float(value):
+    """value as a finite float, from the pipeline or back from a CSV file; None otherwise"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def rollup_keys(movie):
+    """(dimension, value) pairs a row counts towards; a movie counts once towards each of its genres"""
+    year = _finite_float(movie.get('release_year'))
+    keys = [('release_year', str(int(year)) if year else 'Unknown')]
+    genres = [genre.strip() for genre in str(movie.get('genres') or '').split(',') if genre.strip()]
+    keys.extend(('genres', genre) for genre in genres or ['Unknown'])
+    keys.append(('original_language', str(movie.get('original_language') or 'Unknown')))
+    keys.append(('popularity_category', str(movie.get('popularity_category') or 'Unknown')))
+    return keys
+
+class Rollups:
+    """Movie counts, per-measure sums and counts, and quantile sketches for every dimension value
+
+    They describe the current-state table: merge_current_state reports each
+    upsert, and apply() takes the movie's previous row out before adding its
+    new one, so a run only touches the groups its changed movies fall in. Sums
+    are kept as exact integers of SCALED_SUM_UNIT, like FeatureAccumulator's,
+    so taking a row out leaves no rounding behind however many runs go by.
+
+    The state also records the ETag of every current-state bucket the groups
+    reflect. load() rebuilds the groups from the buckets when there is no state
+    yet (ROLLUPS turned on for an existing table) or when a bucket no longer
+    matches, e.g. a run died between rewriting buckets and saving the rollups.
+    """
+
+    def __init__(self, groups=None, etags=None):
+        self.groups = groups or {}  # (dimension, value) -> group
+        self.etags = etags or {}  # Current-state bucket key -> ETag of the contents the groups include
+
+    @staticmethod
+    def _new_group():
+        return {
+            "movies": 0,
+            "sums": dict.fromkeys(ROLLUP_MEASURES, 0),  # Scaled by SCALED_SUM_UNIT
+            "counts": dict.fromkeys(ROLLUP_MEASURES, 0),
+            "sketches": {measure: LogHistogram(ROLLUP_SKETCH_ACCURACY) for measure in ROLLUP_SKETCHED_MEASURES}
+        }
+
+    @classmethod
+    def load(cls, store):
+        s3 = boto3.client("s3")
+        etags = current_state_etags(s3)
+        state = store.get(ROLLUPS_STATE_KEY)
+        if state is None or state["etags"] != etags:
+            logger.warning(f"Rollup state {'is missing' if state is None else 'is out of date'}; "
+                           f"rebuilding it from {len(etags)} current-state buckets")
+            return cls.rebuild(s3, etags)
+        groups = {}
+        for entry in state["groups"]:
+            group = dict(entry["group"])
+            group["sketches"] = {measure: LogHistogram.from_state(sketch) for measure, sketch in group["sketches"].items()}
+            groups[(entry["dimension"], entry["value"])] = group
+        return cls(groups, etags)
+
+    @classmethod
+    def rebuild(cls, s3, etags):
+        """Rollups of the current-state buckets as they are, read in full"""
+        rollups = cls(etags=etags)
+        for file_key in sorted(etags):
+            body = s3.get_object(Bucket=S3_BUCKET_NAME, Key=file_key)["Body"].read()
+            for row in read_output(io.BytesIO(body)):
+                rollups.apply(None, row)
+        return rollups
+
+    def apply(self, previous, movie):
+        """Moves a movie's contribution from its previous row (None for a new movie) to its new one"""
+        for row, sign in ((previous, -1), (movie, 1)):
+            if row is None:
+                continue
+            values = {measure: _finite_float(row.get(measure)) for measure in ROLLUP_MEASURES}
+            for key in rollup_keys(row):
+                group = self.groups.get(key) or self.groups.setdefault(key, self._new_group())
+                group["movies"] += sign
+                for measure, value in values.items():
+                    if value is not None:
+                        group["sums"][measure] += sign * _scaled(value)
+                        group["counts"][measure] += sign
+                        if measure in group["sketches"]:
+                            group["sketches"][measure].add(value, sign)
+                if not group["movies"]:
+                    del self.groups[key]
+
+    def rows(self):
+        """One flat row per dimension value: movies, then each measure's sum, count and average, and sketch quantiles"""
+        for (dimension, value), group in sorted(self.groups.items()):
+            row = {"dimension": dimension, "value": value, "movies": group["movies"]}
+            for measure in ROLLUP_MEASURES:
+                total, count = group["sums"][measure], group["counts"][measure]
+                row[f"{measure}_sum"] = total / SCALED_SUM_UNIT
+                row[f"{measure}_count"] = count
+                row[f"{measure}_avg"] = total / (SCALED_SUM_UNIT * count) if count else None
+            for measure, sketch in group["sketches"].items():
+                row[f"{measure}_p50"] = sketch.quantile(0.5)
+                row[f"{measure}_p90"] = sketch.quantile(0.9)
+            yield row
+
+    def publish(self):
+        """Writes the rollup table to ROLLUPS_KEY as CSV with a header row"""
+        rows = list(self.rows())
+        fieldnames = ["dimension", "value", "movies"] + [
+            f"{measure}_{stat}" for measure in ROLLUP_MEASURES for stat in ("sum", "count", "avg")
+        ] + [f"{measure}_{q}" for measure in ROLLUP_SKETCHED_MEASURES for q in ("p50", "p90")]
+        csv_buffer = StringIO()
+        writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        boto3.client("s3").put_object(Bucket=S3_BUCKET_NAME, Key=ROLLUPS_KEY, Body=csv_buffer.getvalue().encode("utf-8"))
+        logger.info(f"Published {len(rows)} rollup rows to s3://{S3_BUCKET_NAME}/{ROLLUPS_KEY}")
+
+    def save(self, store):
+        """Persists the groups with the ETags of the buckets they now reflect; call it right after the merge"""
+        self.etags = current_state_etags(boto3.client("s3"))
+        store.put(ROLLUPS_STATE_KEY, {"etags": self.etags, "groups": [
+            {"dimension": dimension, "value": value,
+             "group": {**group, "sketches": {measure: sketch.to_state() for measure, sketch in group["sketches"].items()}}}
+            for (dimension, value), group in self.groups.items()
+        ]})
+
+# Detail field -> (bridge table, dimension table, id column)
+BRIDGE_ENTITIES = {
+    'genres': ('movie_genre', 'dim_genre', 'genre_id'),
+    'keywords': ('movie_keyword', 'dim_keyword', 'keyword_id'),
+    'production_companies': ('movie_company', 'dim_company', 'company_id')
+}
+
+class BridgeTables:
+    """Builds movie -> entity bridge rows from each run's movies, keeping the dimension tables in the state store
+
+    Rows carry TMDB's ids from _tmdb_entities. Movies without them (e.g. details
+    cached before BRIDGE_TABLES was turned on) fall back to splitting the joined
+    string and looking each name up in the dimension table; names it has never
+    seen with an id are counted as unresolved and left out.
+    """
+
+    def __init__(self, store, dimensions=None):
+        self.store = store
+        self.dimensions = dimensions or {field: {} for field in BRIDGE_ENTITIES}  # field -> {id: name}
+        self.changed_dimensions = set()
+        self.unresolved = 0
+
+    @classmethod
+    def load(cls, store):
+        dimensions = {}
+        for field, (_, dimension, _) in BRIDGE_ENTITIES.items():
+            # JSON object keys are strings
+            dimensions[field] = {int(entity_id): name for entity_id, name in (store.get(f"dimensions/{dimension}") or {}).items()}
+        return cls(store, dimensions)
+
+    def _ids_by_name(self, field):
+        ids = {}
+        for entity_id in sorted(self.dimensions[field]):
+            ids.setdefault(self.dimensions[field][entity_id], entity_id)
+        return ids
+
+    def extract(self, movies_data):
+        """Bridge rows per detail field for every movie with a usable movie_id"""
+        bridges = {field: [] for field in BRIDGE_ENTITIES}
+        ids_by_name = {}
+        for rows in record_chunks(movies_data, UPLOAD_CHUNK_ROWS):
+            for movie in rows:
+                movie_id = _movie_key(movie.get('movie_id'))
+                if movie_id is None:
+                    continue
+                entities = movie.get('_tmdb_entities')
+                for field, (_, _, id_column) in BRIDGE_ENTITIES.items():
+                    if isinstance(entities, dict):
+                        pairs = entities[field]
+                        for entity_id, name in pairs:
+                            if self.dimensions[field].get(entity_id) != name:
+                                self.dimensions[field][entity_id] = name
+                                self.changed_dimensions.add(field)
+                    else:
+                        if field not in ids_by_name:
+                            ids_by_name[field] = self._ids_by_name(field)
+                        names = [name.strip() for name in str(movie.get(field) or '').split(',') if name.strip()]
+                        pairs = [(ids_by_name[field][name], name) for name in names if name in ids_by_name[field]]
+                        self.unresolved += len(names) - len(pairs)
+                    bridges[field].extend(
+                        {'movie_id': movie_id, id_column: entity_id, 'position': position}
+                        for position, (entity_id, _) in enumerate(pairs)
+                    )
+        return bridges
+
+    def upload(self, bridges, run_date):
+        """Writes this run's bridge tables under dt=YYYY-MM-DD/, and any dimension table that gained or renamed ids"""
+        date = run_date.strftime("%Y-%m-%d")
+        suffix = CSV_COMPRESSION_SUFFIXES.get(CSV_COMPRESSION, '') if OUTPUT_FORMAT == 'csv' else ''
+        s3 = boto3.client("s3")
+        outputs = []
+        for field, (bridge, dimension, id_column) in BRIDGE_ENTITIES.items():
+            outputs.append((f"{BRIDGE_PREFIX}/{bridge}/dt={date}/{bridge}_{date}", bridges[field],
+                            [("movie_id", "BIGINT"), (id_column, "BIGINT"), ("position", "INT")]))
+            if field in self.changed_dimensions:
+                rows = [{id_column: entity_id, 'name': name} for entity_id, name in sorted(self.dimensions[field].items())]
+                outputs.append((f"{BRIDGE_PREFIX}/{dimension}/{dimension}", rows, [(id_column, "BIGINT"), ("name", "STRING")]))
+        for stem, rows, schema in outputs:
+            if not rows:
+                continue
+            file_key = f"{stem}.{OUTPUT_FORMAT}{suffix}"
+            with S3MultipartWriter(s3, S3_BUCKET_NAME, file_key) as writer:
+                write_output(rows, writer, schema=schema)
+                writer.complete()
+            logger.info(f"Uploaded {len(rows)} rows to s3://{S3_BUCKET_NAME}/{file_key}")
+
+    def save(self):
+        for field in self.changed_dimensions:
+            self.store.put(f"dimensions/{BRIDGE_ENTITIES[field][1]}", self.dimensions[field])
+
+    def snapshot(self):
+        return {
+            "dimensions": {BRIDGE_ENTITIES[field][1]: len(ids) for field, ids in self.dimensions.items()},
+            "unresolved_names": self.unresolved
+        }
+
+def merge_current_state(movies_data, buckets=CURRENT_STATE_BUCKETS, on_change=None):
+    """Upserts rows into the current-state table, keyed by movie_id and hash-bucketed into one file per bucket
+
+    Only buckets holding one of this run's movies are read, and only those where
+    a movie is new or its row changed are rewritten, so the work follows the
+    day's delta rather than the table's size. Each bucket is replaced with a
+    single PUT, so readers see either its old or its new contents. on_change,
+    if given, is called with (previous row or None, new row) for each upsert.
+    """
+    if isinstance(movies_data, MovieBatch):
+        movie_ids = movies_data.columns['movie_id'].decode() if len(movies_data) else []
+    else:
+        movie_ids = [movie.get('movie_id') for movie in movies_data]
+    rows_by_bucket = {}
+    for index, movie_id in enumerate(movie_ids):
+        key = _movie_key(movie_id)
+        if key is not None:
+            rows_by_bucket.setdefault(key % buckets, []).append(index)
+
+    suffix = CSV_COMPRESSION_SUFFIXES.get(CSV_COMPRESSION, '') if OUTPUT_FORMAT == 'csv' else ''
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "buckets_rewritten": 0, "buckets": buckets}
+    s3 = boto3.client("s3")
+    for bucket, indices in sorted(rows_by_bucket.items()):
+        if isinstance(movies_data, MovieBatch):
+            rows = movies_data.take(indices).to_records()
+        else:
+            rows = [movies_data[index] for index in indices]
+        file_key = f"{CURRENT_STATE_PREFIX}/bucket={bucket}/movies.{OUTPUT_FORMAT}{suffix}"
+        try:
+            body = s3.get_object(Bucket=S3_BUCKET_NAME, Key=file_key)["Body"].read()
+            current = {_movie_key(row.get('movie_id')): row for row in read_output(io.BytesIO(body))}
+        except s3.exceptions.NoSuchKey:
+            current = {}
+
+        changed = False
+        for movie in rows:
+            key = _movie_key(movie.get('movie_id'))
+            previous = current.get(key)
+            if previous is None:
+                stats["inserted"] += 1
+            elif _stored_form(previous) != _stored_form(movie):
+                stats["updated"] += 1
+            else:
+                stats["unchanged"] += 1
+                continue
+            if on_change is not None:
+                on_change(previous, movie)
+            current[key] = movie
+            changed = True
+        if not changed:
+            continue
+
+        # Sorted by movie_id so Parquet row-group statistics can skip most of a bucket on an id lookup
+        with S3MultipartWriter(s3, S3_BUCKET_NAME, file_key) as writer:
+            write_output([current[key] for key in sorted(current)], writer)
+            writer.complete()
+        stats["buckets_rewritten"] += 1
+
+    logger.info(f"Merged into s3://{S3_BUCKET_NAME}/{CURRENT_STATE_PREFIX}/: {stats['inserted']} inserted, "
+                f"{stats['updated']} updated, {stats['unchanged']} unchanged, "
+                f"{stats['buckets_rewritten']} of {buckets} buckets rewritten")
+    return stats
+
+def _list_objects(s3, prefix):
+    """Yields the listing entry (Key, ETag, Size, ...) of every object under an S3 prefix"""
+    kwargs = {"Bucket": S3_BUCKET_NAME, "Prefix": prefix}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        yield from response.get("Contents", [])
+        if not response.get("IsTruncated"):
+            return
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+def _list_keys(s3, prefix):
+    """Yields every object key under an S3 prefix"""
+    for item in _list_objects(s3, prefix):
+        yield item["Key"]
+
+def current_state_etags(s3):
+    """ETag of every current-state bucket file, keyed by S3 key, from one listing of the prefix"""
+    suffix = CSV_COMPRESSION_SUFFIXES.get(CSV_COMPRESSION, '') if OUTPUT_FORMAT == 'csv' else ''
+    return {
+        item["Key"]: item["ETag"] for item in _list_objects(s3, f"{CURRENT_STATE_PREFIX}/bucket=")
+        if item["Key"].endswith(f"/movies.{OUTPUT_FORMAT}{suffix}")
+    }
+
+def daily_output_rows(s3, day):
+    """Reads back every row the pipeline wrote for one day, whatever OUTPUT_PARTITIONING it used"""
+    suffix = CSV_COMPRESSION_SUFFIXES.get(CSV_COMPRESSION, '') if OUTPUT_FORMAT == 'csv' else ''
+    date = day.strftime("%Y-%m-%d")
+    if OUTPUT_PARTITIONING == 'flat':
+        keys = [key for key in _list_keys(s3, f"{OUTPUT_PREFIX}/movies_data_{date}") if key.endswith(suffix)]
+    else:
+        keys = [key for key in _list_keys(s3, f"{OUTPUT_PREFIX}/dt={date}/") if key.endswith(f".{OUTPUT_FORMAT}{suffix}")]
+
+    rows = []
+    for key in keys:
+        body = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)["Body"].read()
+        file_rows = read_output(io.BytesIO(body))
+        if "/release_year=" in key:
+            # The partition carries the year that was dropped from the file; 0 stood in for unknown
+            year = int(key.split("/release_year=")[1].split("/")[0]) or None
+            for row in file_rows:
+                row['release_year'] = year
+        rows.extend(file_rows)
+    return rows, len(keys)
+
+class CompactedFileWriter:
+    """Writes row groups into a series of Parquet files under an S3 prefix, starting a new file past target_bytes"""
+
+    def __init__(self, s3, prefix, columns, target_bytes, compression="zstd", row_group_size=100000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Compaction needs pyarrow; add a Lambda layer that provides it")
+        self._pa, self._pq = pa, pq
+        self.s3 = s3
+        self.prefix = prefix
+        self.columns = columns
+        self.schema = _arrow_schema(pa, columns)
+        self.target_bytes = target_bytes
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.keys = []
+        self._sink = self._writer = None
+
+    def write(self, rows):
+        for start in range(0, len(rows), self.row_group_size):
+            if self._writer is None:
+                key = f"{self.prefix}/part-{len(self.keys):05d}.parquet"
+                self._sink = S3MultipartWriter(self.s3, S3_BUCKET_NAME, key)
+                self._writer = self._pq.ParquetWriter(self._sink, self.schema, compression=self.compression,
+                                                      write_statistics=True)
+                self.keys.append(key)
+            self._writer.write_table(_arrow_table(self._pa, self.schema, self.columns, rows[start:start + self.row_group_size]))
+            if self._sink.tell() >= self.target_bytes:
+                self._finish_file()
+
+    def _finish_file(self):
+        self._writer.close()
+        self._sink.complete()
+        self._writer = self._sink = None
+
+    def close(self):
+        """Finishes the last file, returning the keys of all of them"""
+        if self._writer is not None:
+            self._finish_file()
+        return self.keys
+
+    def abort(self):
+        if self._sink is not None:
+            self._sink.abort()
+        self._writer = self._sink = None
+
+def compact_daily_outputs(start, end):
+    """Merges the daily outputs from start to end (inclusive) into Parquet files of about COMPACTION_TARGET_MB
+
+    Rows are sorted by (dt, movie_id), so row-group statistics let Athena skip
+    most of a file on a date or id filter; one day is held in memory at a time.
+    The new files go under a prefix of their own, and nothing reads them until
+    the symlink manifest is replaced in a single PUT, so a query sees either the
+    old files or the new ones, never a mix. Files swapped out are deleted by the
+    next compaction, after queries that were already reading them have finished.
+    """
+    s3 = boto3.client("s3")
+    manifest = state_store.get(COMPACTION_MANIFEST_KEY) or {"ranges": {}, "retired": []}
+    range_name = f"{start:%Y-%m-%d}_{end:%Y-%m-%d}"
+    first, last = f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"
+    # A range may replace compacted ranges it covers, but not cut one in two
+    replaced = [name for name, entry in manifest["ranges"].items() if entry["start"] <= last and first <= entry["end"]]
+    for name in replaced:
+        if not first <= manifest["ranges"][name]["start"] <= manifest["ranges"][name]["end"] <= last:
+            raise ValueError(f"{range_name} partly overlaps the compacted range {name}; compact a range covering it")
+    columns = OUTPUT_SCHEMA + [("dt", "STRING")]
+    writer = CompactedFileWriter(s3, f"{COMPACTED_PREFIX}/{range_name}/{uuid.uuid4().hex[:8]}", columns,
+                                 COMPACTION_TARGET_MB * 1024 * 1024, COMPACTION_COMPRESSION, PARQUET_ROW_GROUP_SIZE)
+    rows_compacted = files_read = 0
+    try:
+        day = start
+        while day <= end:
+            rows, file_count = daily_output_rows(s3, day)
+            for row in rows:
+                row['dt'] = f"{day:%Y-%m-%d}"
+            rows.sort(key=lambda row: _movie_key(row.get('movie_id')) or 0)
+            writer.write(rows)
+            rows_compacted += len(rows)
+            files_read += file_count
+            day += timedelta(days=1)
+        keys = writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    result = {"range": range_name, "files_read": files_read, "rows": rows_compacted, "files_written": len(keys)}
+    if not keys:
+        logger.warning(f"No daily outputs found for {range_name}; manifest left as it was")
+        return result
+
+    retiring = manifest["retired"]  # Swapped out by the previous compaction
+    manifest["retired"] = [key for name in replaced for key in manifest["ranges"].pop(name)["files"]]
+    manifest["ranges"][range_name] = {"start": first, "end": last, "files": keys, "rows": rows_compacted}
+
+    symlink = "".join(
+        f"s3://{S3_BUCKET_NAME}/{key}\n"
+        for name in sorted(manifest["ranges"]) for key in manifest["ranges"][name]["files"]
+    )
+    s3.put_object(Bucket=S3_BUCKET_NAME, Key=f"{COMPACTED_PREFIX}/_symlink/symlink.txt", Body=symlink.encode("utf-8"))
+    state_store.put(COMPACTION_MANIFEST_KEY, manifest)
+
+    # Files the previous compaction swapped out: no query can still be reading them
+    for key in retiring:
+        s3.delete_object(Bucket=S3_BUCKET_NAME, Key=key)
+    logger.info(f"Compacted {files_read} daily file(s), {rows_compacted} rows, into {len(keys)} file(s) for {range_name}")
+    result["files_deleted"] = len(retiring)
+    return result
+
 def lambda_handler(event, context):
+    # Per-run counters, reset before any dispatch so shard invocations start clean too
+    http_transport.metrics.reset()
+    rate_limiter.reset_metrics()
+    retry_budget.reset()
+    if details_cache:
+        details_cache.reset_metrics()
+
+    if event and "fanout_shard" in event:
+        return run_fanout_shard(event["fanout_shard"])
+
     logger.info("Starting ETL Process...")
+    run_started = datetime.now(timezone.utc)
+    safety_ms = checkpoint_safety_ms(context)
+    incremental_snapshot = incremental_stats = None
+    bootstrap_progress = None
+    fanout_stats = None
+    merge_stats = None
+    change_detector = ChangeDetector(state_store) if CHANGE_DETECTION else None
+    rollups = None
+    bridge_tables = None
+    output_stem = None
+    concurrency_controller = AIMDConcurrencyController(
+        initial=MAX_WORKERS,
+        min_limit=MIN_CONCURRENCY,
+        max_limit=MAX_CONCURRENCY
+    ) if ADAPTIVE_CONCURRENCY else None
 
     try:
-        # Step 1: Extract Basic Movie Data
-        movies_list = fetch_movies(max_pages=MAX_PAGES)
+        if ROLLUPS:
+            if not CURRENT_STATE_MERGE:
+                raise ValueError("ROLLUPS needs CURRENT_STATE_MERGE=true")
+            rollups = Rollups.load(state_store)
+        if PIPELINE_MODE == 'fanout' and FANOUT_EXECUTOR == 'lambda' and STATE_STORE != 's3':
+            # Shard invocations run in containers of their own, which can't see a local directory or SQLite file
+            raise ValueError("FANOUT_EXECUTOR=lambda needs STATE_STORE=s3")
 
-        if not movies_list:
-            raise Exception("Failed to fetch movies")
+        if PIPELINE_MODE == 'streaming':
+            # Steps 1 & 2: Extract and Enrich, overlapping page listing with detail calls
+            enriched_movies = stream_enrich_movies(
+                max_pages=MAX_PAGES,
+                max_details=MAX_DETAILS,
+                max_workers=MAX_WORKERS,
+                queue_size=STREAM_QUEUE_SIZE,
+                concurrency_controller=concurrency_controller
+            )
 
-        # Step 2: Enrich with Detailed Information (using parallel processing)
-        enriched_movies = enrich_movie_data_parallel(
-            movies_list,
-            max_details=MAX_DETAILS,
-            max_workers=MAX_WORKERS
-        )
+            if not enriched_movies:
+                raise Exception("Failed to fetch movies")
+        elif PIPELINE_MODE == 'bootstrap':
+            # Steps 1 & 2: Extract IDs from the daily export and Enrich the next MAX_DETAILS of them
+            progress = state_store.get(BOOTSTRAP_PROGRESS_KEY) or {}
+            source = (event or {}).get("bootstrap_source") or BOOTSTRAP_SOURCE or progress.get("source") \
+                or BOOTSTRAP_EXPORT_URL.format(date=run_started - timedelta(days=1))
+            start_offset = (event or {}).get("bootstrap_offset")
+            if start_offset is None and progress.get("exhausted") and progress.get("source") == source:
+                # Every ID in this export is already loaded; uploading would only add a "No Data" file
+                logger.info(f"Bootstrap of {source} already finished at offset {progress['offset']}; nothing to do")
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps({"status": "Success", "movies_processed": 0, "bootstrap": progress})
+                }
+            if start_offset is None:
+                start_offset = progress.get("offset", 0) if progress.get("source") == source else 0
+
+            logger.info(f"Bootstrapping from {source} at offset {start_offset}")
+            enriched_movies = []
+            next_offset = start_offset
+            for next_offset, batch in bootstrap_movies(
+                source,
+                start_offset=start_offset,
+                limit=MAX_DETAILS,
+                batch_size=BOOTSTRAP_BATCH_SIZE,
+                max_workers=MAX_WORKERS,
+                concurrency_controller=concurrency_controller
+            ):
+                enriched_movies.extend(batch)
+                if remaining_time_is_short(context, safety_ms):
+                    # Write what we have; the saved offset makes the next run pick up from here
+                    logger.warning(f"Running out of time; stopping bootstrap at offset {next_offset}")
+                    break
+
+            bootstrap_progress = {
+                "source": source,
+                "start_offset": start_offset,
+                "offset": next_offset,
+                "exhausted": len(enriched_movies) < MAX_DETAILS and not remaining_time_is_short(context, safety_ms)
+            }
+            output_stem = f"bootstrap_outputs/movies_data_{run_started:%Y-%m-%d}_{start_offset}"
+        elif PIPELINE_MODE == 'fanout':
+            # Step 1: Extract Basic Movie Data
+            if EXTRACTION_MODE == 'async':
+                movies_list = fetch_movies_async(
+                    max_pages=MAX_PAGES,
+                    concurrency=EXTRACTION_CONCURRENCY
+                )
+            else:
+                movies_list = fetch_movies(max_pages=MAX_PAGES)
+
+            if not movies_list:
+                raise Exception("Failed to fetch movies")
+
+            # Step 2: Enrich across shards, each capped at MAX_DETAILS movies
+            enriched_movies, fanout_stats = enrich_movies_fanout(
+                movies_list,
+                context=context,
+                shards=FANOUT_SHARDS,
+                executor=FANOUT_EXECUTOR,
+                max_details=MAX_DETAILS * FANOUT_SHARDS if MAX_DETAILS else None,
+                max_workers=MAX_WORKERS
+            )
+        elif INCREMENTAL_MODE:
+            # Step 1: Extract Basic Movie Data
+            if EXTRACTION_MODE == 'async':
+                movies_list = fetch_movies_async(
+                    max_pages=MAX_PAGES,
+                    concurrency=EXTRACTION_CONCURRENCY
+                )
+            else:
+                movies_list = fetch_movies(max_pages=MAX_PAGES)
+
+            if not movies_list:
+                raise Exception("Failed to fetch movies")
+
+            # Step 2: Enrich only new or changed movies
+            enriched_movies, incremental_snapshot, incremental_stats = enrich_movies_incremental(
+                movies_list,
+                state_store.get(INCREMENTAL_SNAPSHOT_KEY),
+                run_started,
+                max_details=MAX_DETAILS,
+                max_workers=MAX_WORKERS,
+                concurrency_controller=concurrency_controller
+            )
+        else:
+            # Steps 1 & 2: Extract and Enrich, checkpointing if enabled and the Lambda runs short of time
+            continuation_token = (event or {}).get("continuation_token")
+            checkpoint = None
+            if continuation_token:
+                checkpoint = state_store.get(f"checkpoints/{continuation_token}")
+                if checkpoint is None:
+                    raise Exception(f"Unknown continuation token: {continuation_token}")
+                logger.info(f"Resuming from checkpoint {continuation_token} at stage {checkpoint['stage']}")
+
+            enriched_movies, checkpoint = extract_and_enrich_resumable(
+                context if CHECKPOINTING else None,
+                checkpoint,
+                max_pages=MAX_PAGES,
+                max_details=MAX_DETAILS,
+                max_workers=MAX_WORKERS,
+                concurrency_controller=concurrency_controller,
+                chunk_size=CHECKPOINT_CHUNK_SIZE,
+                safety_ms=safety_ms
+            )
+
+            if checkpoint is not None:
+                continuation_token = continuation_token or f"{run_started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+                state_store.put(f"checkpoints/{continuation_token}", checkpoint)
+                logger.info(f"Checkpoint saved; resume with continuation token {continuation_token}")
+                resumed = CHECKPOINT_AUTO_RESUME and getattr(context, "function_name", None) is not None
+                if resumed:
+                    invoke_continuation(context.function_name, continuation_token)
+                return {
+                    "statusCode": 202,
+                    "body": json.dumps({
+                        "status": "Checkpointed",
+                        "continuation_token": continuation_token,
+                        "resumed": resumed,
+                        "stage": checkpoint["stage"],
+                        "pages_fetched": checkpoint["pages_fetched"],
+                        "movies_enriched": len(checkpoint["details"])
+                    })
+                }
+            if continuation_token:
+                state_store.delete(f"checkpoints/{continuation_token}")
 
         # Step 3: Clean, Transform, and Engineer Features
-        cleaned_movies = clean_transform_data(enriched_movies)
+        imputation_state = ImputationState.load(state_store) if IMPUTATION_STATS == 'long_run' else None
+        cleaned_movies = clean_transform_batch(MovieBatch.from_records(enriched_movies), imputation_state)
+
+        # Step 4: Load Data to S3, and upsert it into the current-state table
+        if BRIDGE_TABLES:
+            bridge_tables = BridgeTables.load(state_store)
+            bridge_tables.upload(bridge_tables.extract(cleaned_movies), run_started)
+        # TMDB entity ids only feed the bridge tables; the fact table keeps the joined strings
+        cleaned_movies = cleaned_movies.drop('_tmdb_entities')
+        changed_movies = cleaned_movies
+        if change_detector:
+            changed_rows = change_detector.classify(cleaned_movies)
+            changed_movies = cleaned_movies.take(changed_rows)
+        if DAILY_OUTPUT_ROWS != 'changed':
+            upload_to_s3(cleaned_movies, file_stem=output_stem)
+        elif len(changed_movies):
+            # The daily outputs become a change log: only new and changed movies are appended
+            upload_to_s3(changed_movies, file_stem=output_stem)
+        if CURRENT_STATE_MERGE:
+            # Movies whose fingerprint is unchanged are already current, so their buckets aren't even read
+            merge_stats = merge_current_state(changed_movies, on_change=rollups.apply if rollups else None)
+        if rollups:
+            # Saved straight after the merge; if the run dies before this, the next load sees
+            # the rewritten buckets' new ETags and rebuilds instead of applying deltas to stale groups
+            rollups.save(state_store)
+            rollups.publish()
 
-        # Step 4: Load Data to S3
-        upload_to_s3(cleaned_movies)
+        # Step 5: Record what this run fetched, now that its output is safely written
+        if incremental_snapshot:
+            state_store.put(INCREMENTAL_SNAPSHOT_KEY, incremental_snapshot)
+        if bootstrap_progress:
+            state_store.put(BOOTSTRAP_PROGRESS_KEY, bootstrap_progress)
+        if imputation_state:
+            imputation_state.save(state_store)
+        if change_detector:
+            change_detector.save()
+        if bridge_tables:
+            bridge_tables.save()
 
         logger.info("ETL Pipeline Execution Completed Successfully.")
         return {
@@ -326,7 +3458,23 @@ def lambda_handler(event, context):
             "body": json.dumps({
                 "status": "Success",
                 "movies_processed": len(cleaned_movies),
-                "destination": f"s3://{S3_BUCKET_NAME}/{S3_FILE_NAME}"
+                "destination": f"s3://{S3_BUCKET_NAME}/{S3_FILE_NAME}",
+                "http": http_transport.metrics.snapshot(),
+                "rate_limiter": rate_limiter.snapshot(),
+                "retries": retry_budget.snapshot(),
+                "details_cache": details_cache.snapshot() if details_cache else None,
+                "incremental": incremental_stats,
+                "bootstrap": bootstrap_progress,
+                "fanout": fanout_stats,
+                "imputation": imputation_state.snapshot() if imputation_state else None,
+                "current_state": merge_stats,
+                "changes": change_detector.snapshot() if change_detector else None,
+                "bridges": bridge_tables.snapshot() if bridge_tables else None,
+                # Fan-out shards enrich in their own invocations, each with a fixed pool of MAX_WORKERS
+                "concurrency": None if PIPELINE_MODE == 'fanout' else concurrency_controller.snapshot() if concurrency_controller else {
+                    "adaptive": False,
+                    "limit": MAX_WORKERS
+                }
             })
         }
 
@@ -338,4 +3486,31 @@ def lambda_handler(event, context):
                 "status": "Failure",
                 "error": str(e)
             })
-        }
\ No newline at end of file
+        }
+
+def compaction_handler(event, context):
+    """Compacts a date range of daily outputs; event: {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+
+    Both dates default to yesterday. Schedule it separately from lambda_handler,
+    e.g. weekly or monthly over the period just finished.
+    """
+    try:
+        yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).date()
+        start = date.fromisoformat((event or {}).get("start_date") or f"{yesterday:%Y-%m-%d}")
+        end = date.fromisoformat((event or {}).get("end_date") or f"{yesterday:%Y-%m-%d}")
+        if end < start:
+            raise ValueError(f"end_date {end} is before start_date {start}")
+        result = compact_daily_outputs(start, end)
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"status": "Success", **result})
+        }
+    except Exception as e:
+        logger.error(f"Compaction Failed: {str(e)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({
+                "status": "Failure",
+                "error": str(e)
+            })
+        }